@@ -0,0 +1,148 @@
+"""
+Analysis Task - Budgeted Background Analysis
+Runs one recipe analysis in a daemon thread with a time and size budget.
+Partial results (ingredients resolved so far, running score) are published as
+the task goes, the task can be cancelled at any time, and results are marked
+truncated when a budget runs out.
+"""
+
+import threading
+import time
+
+from match_stats import CUMULATIVE_STATS, MatchStats
+from recipe_checker_simple import (
+    build_analysis_result,
+    build_match_index,
+    collect_matches,
+    extract_line_ingredients,
+    match_ingredient,
+    uses_line_breaks,
+)
+
+
+DEFAULT_TIME_BUDGET = 10.0
+DEFAULT_MAX_CHARS = 200000
+DEFAULT_MAX_INGREDIENTS = 5000
+PUBLISH_INTERVAL = 0.2
+
+
+class AnalysisTask:
+    """One cancellable analyze_recipe run in a background thread.
+
+    The finished result equals analyze_recipe's for the same text unless a budget ran
+    out, the task was cancelled or matching raised; then it covers the lines processed so
+    far and has truncated=True with a truncated_reason of 'time', 'size', 'cancelled' or
+    'error'. lines_total always counts the lines of the full text.
+    """
+
+    def __init__(self, recipe_text, food_map, index=None, score_mode='count', time_budget=DEFAULT_TIME_BUDGET,
+                 max_chars=DEFAULT_MAX_CHARS, max_ingredients=DEFAULT_MAX_INGREDIENTS):
+        self.recipe_text = recipe_text
+        self.food_map = food_map
+        self.index = index
+        self.score_mode = score_mode
+        self.time_budget = time_budget
+        self.max_chars = max_chars
+        self.max_ingredients = max_ingredients
+        self.started_at = None
+        self.elapsed = 0.0
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._partial = None
+        self._thread = threading.Thread(target=self._run, name='recipe-analysis', daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Ask the task to stop; it finishes with the results gathered so far."""
+        self._cancel.set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the task finishes or timeout passes. Returns True if it finished."""
+        return self._done.wait(timeout)
+
+    def snapshot(self):
+        """Latest published results: partial while running, final once done. None before the first publish."""
+        with self._lock:
+            return self._partial
+
+    def _publish(self, ingredient_quantities, matches, stats, lines_done, lines_total, truncated_reason=None,
+                 final=False):
+        found_items, all_ingredients = collect_matches(
+            [ingredient for ingredient, _ in ingredient_quantities], matches.__getitem__
+        )
+        results = build_analysis_result(found_items, all_ingredients, ingredient_quantities, self.food_map,
+                                        self.score_mode, stats if final else None)
+        results.update({
+            'done': final,
+            'truncated': truncated_reason is not None,
+            'truncated_reason': truncated_reason,
+            'lines_done': lines_done,
+            'lines_total': lines_total,
+        })
+        with self._lock:
+            self._partial = results
+
+    def _run(self):
+        deadline = self.started_at + self.time_budget
+        truncated_reason = None
+        text = self.recipe_text
+        lines_total = text.count('\n') + 1
+        if len(text) > self.max_chars:
+            # Cut at a line boundary so no ingredient is split in half
+            cut = text.rfind('\n', 0, self.max_chars)
+            text = text[:cut if cut > 0 else self.max_chars]
+            truncated_reason = 'size'
+
+        stats = MatchStats()
+        ingredient_quantities = []
+        matches = {}
+        lines_done = 0
+        next_publish = time.perf_counter() + PUBLISH_INTERVAL
+
+        try:
+            lines = text.split('\n')
+            use_line_breaks = uses_line_breaks(lines)
+            index = self.index if self.index is not None else build_match_index(self.food_map)
+            for line in lines:
+                if self._cancel.is_set():
+                    truncated_reason = 'cancelled'
+                    break
+                if time.perf_counter() > deadline:
+                    truncated_reason = 'time'
+                    break
+                line_ingredients = extract_line_ingredients(line, use_line_breaks, with_quantities=True)
+                if len(ingredient_quantities) + len(line_ingredients) > self.max_ingredients:
+                    truncated_reason = 'size'
+                    break
+                for ingredient, _ in line_ingredients:
+                    if ingredient not in matches:
+                        matches[ingredient] = match_ingredient(ingredient, self.food_map, stats, index)
+                ingredient_quantities.extend(line_ingredients)
+                lines_done += 1
+
+                if time.perf_counter() >= next_publish:
+                    self._publish(ingredient_quantities, matches, stats, lines_done, lines_total)
+                    next_publish = time.perf_counter() + PUBLISH_INTERVAL
+        except Exception as e:
+            # A failed line must not pass for a complete result; keep what was resolved before it
+            print(f"Error analyzing recipe: {e}")
+            truncated_reason = 'error'
+        finally:
+            CUMULATIVE_STATS.merge(stats)
+            self._publish(ingredient_quantities, matches, stats, lines_done, lines_total, truncated_reason, final=True)
+            self.elapsed = time.perf_counter() - self.started_at
+            self._done.set()
+
+
+def start_analysis(recipe_text, food_map, index=None, score_mode='count', **budget):
+    """Start an AnalysisTask; budget takes time_budget, max_chars and max_ingredients."""
+    return AnalysisTask(recipe_text, food_map, index, score_mode, **budget).start()
@@ -6,11 +6,20 @@ from __future__ import annotations
 
 import base64
 from pathlib import Path
-from typing import Dict, List, Tuple
+import time
+from typing import Dict, List, Optional, Tuple
 
 import streamlit as st
 
 from recipe_checker_simple import analyze_recipe, add_food_item, clean_food_item_name
+from analysis_task import AnalysisTask, start_analysis
+from food_map_store import FoodMapStore
+from recipe_importer import looks_like_html, recipe_text_from_html
+from live_analysis import LineCache, analyze_live
+from meal_plan import analyze_meal_plan, split_meal_plan
+from match_stats import CUMULATIVE_STATS, MATCH_TIERS
+from recipe_library import list_library_items, query_recipes, rescore_in_background, save_recipe
+from request_capture import RequestCapture, capture_from_env
 
 
 # Page configuration
@@ -494,6 +503,7 @@ LEVEL_LABELS: Dict[int, str] = {
     1: "🟡 Moderation",
     0: "🟢 Safe",
 }
+@st.cache_data(show_spinner=False, max_entries=64)
 def build_results_markdown(categorized: Dict[int, List[Tuple[str, Dict[str, str]]]]) -> str:
     """Create a markdown summary grouped by risk level."""
     lines: List[str] = []
@@ -522,14 +532,9 @@ def build_results_markdown(categorized: Dict[int, List[Tuple[str, Dict[str, str]
     return "\n".join(lines)
 
 
-def build_all_ingredients_cards(all_ingredients: Dict[str, Dict]) -> Tuple[Dict[str, Dict], List[str]]:
-    """Display ingredients as cards with status badges. Returns ingredients dict and list of unknown ingredients."""
-    if not all_ingredients:
-        st.info("No ingredients detected in the recipe.")
-        return {}, []
-    
-    st.markdown("### All Ingredients")
-    
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_ingredient_cards_html(all_ingredients: Dict[str, Dict]) -> Tuple[str, List[str]]:
+    """Render every ingredient card as one HTML block. Returns the HTML and the unknown ingredients."""
     # Status color mapping
     status_colors = {
         "❓ Unknown": "#9d7766",
@@ -540,6 +545,7 @@ def build_all_ingredients_cards(all_ingredients: Dict[str, Dict]) -> Tuple[Dict[
     }
     
     unknown_ingredients = []
+    cards = []
     
     for ingredient, info in sorted(all_ingredients.items()):
         matched = info.get('matched', False)
@@ -582,11 +588,353 @@ def build_all_ingredients_cards(all_ingredients: Dict[str, Dict]) -> Tuple[Dict[
             {f'<div style="font-size: 10px; color: var(--retro-muted);">{notes if notes else ("Not in food map" if not matched else "")}</div>' if (notes or not matched) else ''}
         </div>
         """
-        st.markdown(card_html, unsafe_allow_html=True)
+        cards.append(card_html)
+    
+    return "".join(cards), unknown_ingredients
+
+
+def build_all_ingredients_cards(all_ingredients: Dict[str, Dict]) -> Tuple[Dict[str, Dict], List[str]]:
+    """Display ingredients as cards with status badges. Returns ingredients dict and list of unknown ingredients."""
+    if not all_ingredients:
+        st.info("No ingredients detected in the recipe.")
+        return {}, []
+    
+    st.markdown("### All Ingredients")
+    cards_html, unknown_ingredients = build_ingredient_cards_html(all_ingredients)
+    st.markdown(cards_html, unsafe_allow_html=True)
     
     return all_ingredients, unknown_ingredients
 
 
+CATEGORY_BUTTONS: Tuple[Tuple[int, str, str], ...] = (
+    (0, "btn_safe", "Safe"),
+    (1, "btn_mod", "Moderation"),
+    (2, "btn_avoid", "Avoid"),
+    (3, "btn_never", "Never"),
+)
+
+
+@st.fragment
+def render_results_view(results: Dict) -> List[str]:
+    """Score and ingredient cards. Returns the unknown ingredients for the categorize panel."""
+    if results.get("truncated"):
+        st.warning(
+            f"The analysis {TRUNCATED_REASONS.get(results['truncated_reason'], 'stopped early')}: "
+            f"results cover the first {results['lines_done']} of {results['lines_total']} lines."
+        )
+    score_label = "Exposure Risk Score" if results.get("score_mode") == "exposure" else "Total Risk Score"
+    st.metric(score_label, str(results.get("total_score", 0)))
+
+    st.divider()
+    
+    _, unknown_ingredients = build_all_ingredients_cards(results.get("all_ingredients", {}))
+    return unknown_ingredients
+
+
+@st.fragment
+def render_categorize_panel(unknown_ingredients: List[str]) -> None:
+    """Checkboxes and category buttons; ticking a checkbox only reruns this panel."""
+    st.divider()
+    st.markdown("### Categorize Unknown Ingredients")
+    st.markdown("Select unknown ingredients and assign them to a risk category:")
+    
+    cols = st.columns(2)
+    checkbox_states = {}
+    
+    for i, ingredient in enumerate(sorted(unknown_ingredients)):
+        with cols[i % 2]:
+            checkbox_states[ingredient] = st.checkbox(ingredient.title(), key=f"unknown_{ingredient}")
+    
+    selected_ingredients = [ing for ing, selected in checkbox_states.items() if selected]
+    if not selected_ingredients:
+        return
+    
+    st.markdown("**Assign category:**")
+    category_cols = st.columns(len(CATEGORY_BUTTONS))
+    for column, (level, key, name) in zip(category_cols, CATEGORY_BUTTONS):
+        with column:
+            if st.button(LEVEL_LABELS[level], key=key, use_container_width=True):
+                started = time.perf_counter()
+                added_count = 0
+                for ingredient in selected_ingredients:
+                    if add_food_item("Food_Map_Levels.xlsx", ingredient, level):
+                        added_count += 1
+                capture = get_request_capture()
+                if capture is not None:
+                    capture.capture_categorize(selected_ingredients, level, added_count, time.perf_counter() - started)
+                if added_count > 0:
+                    rescore_in_background(selected_ingredients, excel_path="Food_Map_Levels.xlsx")
+                    st.success(f"Added {added_count} ingredient(s) as {name}!")
+                    st.session_state.scan_results = analyze_with_store(
+                        st.session_state.recipe_text_state, st.session_state.score_mode, refresh=True,
+                        source="categorize",
+                    )
+                    # The cards and summary outside this panel changed too
+                    st.rerun(scope="app")
+
+
+@st.cache_resource
+def get_food_map_store() -> FoodMapStore:
+    """One food map store per server process, kept fresh by its watcher thread."""
+    return FoodMapStore("Food_Map_Levels.xlsx").start()
+
+
+@st.cache_resource
+def get_request_capture() -> Optional[RequestCapture]:
+    """Process-wide request recorder, or None unless RECIPE_CAPTURE is set."""
+    return capture_from_env()
+
+
+def analyze_with_store(recipe_text: str, score_mode: str, refresh: bool = False, source: str = "scan") -> Dict:
+    """Analyze against the store's ready snapshot; refresh=True picks up this session's own edits first."""
+    started = time.perf_counter()
+    store = get_food_map_store()
+    snapshot = store.refresh() if refresh else store.current()
+    if snapshot is None:
+        results = analyze_recipe(recipe_text, excel_path="Food_Map_Levels.xlsx", score_mode=score_mode)
+    else:
+        results = analyze_recipe(
+            recipe_text, score_mode=score_mode, food_map=snapshot.food_map, index=snapshot.index
+        )
+    capture = get_request_capture()
+    if capture is not None:
+        capture.capture_analysis(
+            source, recipe_text, results, time.perf_counter() - started, snapshot.version if snapshot else None
+        )
+    return results
+
+
+# Scans that finish within this long render directly; slower ones continue in the background
+QUICK_SCAN_SECONDS = 0.5
+TRUNCATED_REASONS: Dict[str, str] = {
+    "time": "ran out of time",
+    "size": "hit the size limit",
+    "cancelled": "was cancelled",
+    "error": "hit an error",
+}
+
+
+def start_scan_task(recipe_text: str, score_mode: str) -> Optional[AnalysisTask]:
+    """Start a budgeted background analysis against the store's snapshot; None if the map can't load."""
+    snapshot = get_food_map_store().current()
+    if snapshot is None:
+        return None
+    return start_analysis(recipe_text, snapshot.food_map, snapshot.index, score_mode)
+
+
+def finish_scan_task(task: AnalysisTask) -> None:
+    """Move a finished task's results into the session; only complete results go to the library."""
+    results = task.snapshot()
+    st.session_state.scan_results = results
+    st.session_state.analysis_task = None
+    capture = get_request_capture()
+    if capture is not None:
+        snapshot = get_food_map_store().current()
+        capture.capture_analysis("scan", task.recipe_text, results, task.elapsed, snapshot.version if snapshot else None)
+    if not results["truncated"]:
+        save_recipe(task.recipe_text, results)
+
+
+@st.fragment(run_every=0.5)
+def render_analysis_progress() -> None:
+    """Partial results of the running scan, refreshed until it finishes or is cancelled."""
+    task = st.session_state.get("analysis_task")
+    if task is None:
+        return
+    if task.done:
+        finish_scan_task(task)
+        st.rerun(scope="app")
+
+    st.markdown("### Analyzing...")
+    partial = task.snapshot()
+    if partial:
+        st.progress(
+            partial["lines_done"] / max(1, partial["lines_total"]),
+            text=f"{partial['lines_done']} of {partial['lines_total']} lines",
+        )
+        st.metric("Running score", str(partial["total_score"]))
+        st.markdown(build_results_markdown(partial["categorized"]))
+    else:
+        st.progress(0.0, text="Starting...")
+
+    if st.button("Cancel", key="cancel_analysis", use_container_width=True):
+        task.cancel()
+        task.wait()
+        finish_scan_task(task)
+        st.rerun(scope="app")
+
+
+def render_library_page() -> None:
+    """Browse saved recipes with score, worst-level and contained-item filters."""
+    st.markdown("### Recipe Library")
+
+    filter_cols = st.columns(2)
+    with filter_cols[0]:
+        max_score = st.number_input("Max total score", min_value=0, value=None, step=1)
+        no_never = st.checkbox(f"No {LEVEL_LABELS[3]} items")
+    with filter_cols[1]:
+        contains_item = st.selectbox("Contains item", ["Any"] + list_library_items())
+        item_level_label = st.selectbox("At level", ["Any"] + [LEVEL_LABELS[level] for level in LEVEL_ORDER])
+    limit = st.slider("Show safest", min_value=5, max_value=200, value=25, step=5)
+
+    item_level = None
+    for level, label in LEVEL_LABELS.items():
+        if label == item_level_label:
+            item_level = level
+
+    recipes = query_recipes(
+        max_score=max_score,
+        exclude_levels=(3,) if no_never else (),
+        contains_item=None if contains_item == "Any" else contains_item,
+        item_level=item_level,
+        limit=limit,
+    )
+    if not recipes:
+        st.info("No saved recipes match these filters.")
+        return
+
+    st.dataframe(
+        [
+            {
+                "Recipe": recipe["name"],
+                "Score": recipe["total_score"],
+                "Worst": LEVEL_LABELS.get(recipe["max_level"], ""),
+                **{LEVEL_LABELS[level]: recipe["level_counts"][level] for level in LEVEL_ORDER},
+            }
+            for recipe in recipes
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+def render_meal_plan_page() -> None:
+    """Analyze a week of recipes together, matching each distinct ingredient once."""
+    st.markdown("### Meal Plan")
+    with st.form("meal_plan_form", clear_on_submit=False):
+        plan_text = st.text_area(
+            "Recipes, separated by a line containing only ---; start a line with # to give a recipe a title",
+            height=260,
+            placeholder="# Monday pasta\n2 cups flour\n2 eggs\n---\n# Tuesday soup\n1 onion\n2 cups broth",
+        )
+        uploaded_pages = st.file_uploader(
+            "Or upload saved recipe pages", type=["html", "htm"], accept_multiple_files=True
+        )
+        weigh_by_quantity = st.checkbox("Weigh score by quantity", help="A pinch counts far less than a pound.")
+        run_plan = st.form_submit_button("Check Plan", use_container_width=True)
+
+    if run_plan:
+        recipes = split_meal_plan(plan_text)
+        for page_file in uploaded_pages or []:
+            page_text = recipe_text_from_html(page_file.getvalue().decode("utf-8", errors="replace"))
+            if page_text.strip():
+                recipes.append((page_file.name, page_text))
+        if not recipes:
+            st.warning("Please enter at least one recipe.")
+            st.session_state.meal_plan_results = None
+        else:
+            snapshot = get_food_map_store().current()
+            st.session_state.meal_plan_results = analyze_meal_plan(
+                recipes,
+                excel_path="Food_Map_Levels.xlsx",
+                score_mode="exposure" if weigh_by_quantity else "count",
+                food_map=snapshot.food_map if snapshot else None,
+                index=snapshot.index if snapshot else None,
+            )
+
+    plan = st.session_state.get("meal_plan_results")
+    if not plan:
+        return
+    if "error" in plan:
+        st.error(plan["error"])
+        return
+
+    metric_cols = st.columns(3)
+    metric_cols[0].metric("Plan score", plan["total_score"])
+    metric_cols[1].metric("Recipes", len(plan["recipes"]))
+    metric_cols[2].metric("Distinct ingredients", f"{plan['distinct_ingredients']} / {plan['ingredient_lines']}")
+
+    st.markdown("**Exposure by level**")
+    st.dataframe(
+        [
+            {
+                "Recipe": recipe["name"],
+                "Score": recipe["total_score"],
+                **{LEVEL_LABELS[level]: recipe["exposure_by_level"][level] for level in (1, 2, 3)},
+            }
+            for recipe in plan["recipes"]
+        ]
+        + [{"Recipe": "Whole plan", "Score": plan["total_score"],
+            **{LEVEL_LABELS[level]: plan["exposure_by_level"][level] for level in (1, 2, 3)}}],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    if plan["offenders"]:
+        st.markdown("**Worst offenders**")
+        st.dataframe(
+            [
+                {
+                    "Item": offender["food_item"].title(),
+                    "Level": LEVEL_LABELS[offender["level"]],
+                    "Exposure": offender["exposure"],
+                    "Recipes": ", ".join(offender["recipes"]),
+                }
+                for offender in plan["offenders"]
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+
+
+def render_match_stats(stats: Dict) -> None:
+    """Show match tier counters from a MatchStats summary."""
+    metric_cols = st.columns(3)
+    metric_cols[0].metric("Ingredients", stats["ingredients"])
+    metric_cols[1].metric("Avg entries scanned", stats["avg_comparisons"])
+    metric_cols[2].metric("Unknown rate", f"{stats['unknown_rate']:.0%}")
+
+    st.dataframe(
+        [
+            {
+                "Tier": tier,
+                "Hits": stats["tier_hits"][tier],
+                "Share": f"{stats['tier_share'][tier]:.0%}",
+                "Avg entries scanned": stats["tier_avg_comparisons"][tier],
+                "Time (ms)": stats["tier_ms"][tier],
+            }
+            for tier in MATCH_TIERS
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+    if stats["slowest"]:
+        st.markdown("**Slowest ingredients**")
+        st.dataframe(stats["slowest"], hide_index=True, use_container_width=True)
+    if stats["expensive_entries"]:
+        st.markdown("**Entries behind the most fallback scanning**")
+        st.dataframe(stats["expensive_entries"], hide_index=True, use_container_width=True)
+
+
+def render_stats_page() -> None:
+    """Show match statistics for the last scan and for everything since the server started."""
+    st.markdown("### Match Statistics")
+    last_results = st.session_state.get("scan_results")
+    if last_results and last_results.get("match_stats"):
+        st.markdown("#### Last scan")
+        render_match_stats(last_results["match_stats"])
+
+    st.markdown("#### All scans")
+    render_match_stats(CUMULATIVE_STATS.to_dict())
+    st.download_button(
+        "Download JSON",
+        CUMULATIVE_STATS.to_json(indent=2),
+        file_name="match_stats.json",
+        mime="application/json",
+        use_container_width=True,
+    )
+
+
 # Main application
 # Hero banner with T-Rex image
 if DINO_IMAGE_B64:
@@ -608,27 +956,88 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-with st.form("recipe_form", clear_on_submit=False):
-    recipe_text = st.text_area(
-        "Recipe",
-        height=220,
-        placeholder="Paste your recipe here...\nExample:\n2 cups rice\n1 lb chicken\n3 cloves garlic\n2 tbsp butter"
-    )
-    run_scan = st.form_submit_button("Check It!", use_container_width=True)
+page = st.sidebar.radio("Page", ("Scanner", "Meal Plan", "Library", "Match Stats"))
+if page == "Meal Plan":
+    render_meal_plan_page()
+    st.stop()
+if page == "Library":
+    render_library_page()
+    st.stop()
+if page == "Match Stats":
+    render_stats_page()
+    st.stop()
 
 if 'scan_results' not in st.session_state:
     st.session_state.scan_results = None
 if 'recipe_text_state' not in st.session_state:
     st.session_state.recipe_text_state = ""
-
-if run_scan:
-    if not recipe_text.strip():
-        st.warning("Please enter a recipe before running the scan.")
-        st.session_state.scan_results = None
+if 'score_mode' not in st.session_state:
+    st.session_state.score_mode = "count"
+if 'analysis_task' not in st.session_state:
+    st.session_state.analysis_task = None
+
+RECIPE_PLACEHOLDER = "Paste your recipe here...\nExample:\n2 cups rice\n1 lb chicken\n3 cloves garlic\n2 tbsp butter"
+
+live_mode = st.toggle("Live mode", help="Re-check as you edit. Only the lines you changed are re-analyzed.")
+
+if live_mode:
+    live_text = st.text_area("Recipe", key="live_recipe_text", height=220, placeholder=RECIPE_PLACEHOLDER)
+    weigh_by_quantity = st.checkbox("Weigh score by quantity", help="A pinch counts far less than a pound.")
+    if "line_cache" not in st.session_state:
+        st.session_state.line_cache = LineCache()
+
+    if looks_like_html(live_text):
+        live_text = recipe_text_from_html(live_text)
+    if live_text.strip():
+        st.session_state.score_mode = "exposure" if weigh_by_quantity else "count"
+        started = time.perf_counter()
+        store = get_food_map_store()
+        st.session_state.scan_results = analyze_live(
+            live_text, st.session_state.line_cache, excel_path="Food_Map_Levels.xlsx", score_mode=st.session_state.score_mode,
+            store=store,
+        )
+        capture = get_request_capture()
+        if capture is not None:
+            snapshot = store.current()
+            capture.capture_analysis(
+                "live", live_text, st.session_state.scan_results, time.perf_counter() - started,
+                snapshot.version if snapshot else None,
+            )
+        st.session_state.recipe_text_state = live_text
     else:
-        results = analyze_recipe(recipe_text, excel_path="Food_Map_Levels.xlsx")
-        st.session_state.scan_results = results
-        st.session_state.recipe_text_state = recipe_text
+        st.session_state.scan_results = None
+else:
+    with st.form("recipe_form", clear_on_submit=False):
+        recipe_text = st.text_area("Recipe", height=220, placeholder=RECIPE_PLACEHOLDER)
+        uploaded_page = st.file_uploader("Or upload a saved recipe page", type=["html", "htm"])
+        weigh_by_quantity = st.checkbox("Weigh score by quantity", help="A pinch counts far less than a pound.")
+        run_scan = st.form_submit_button("Check It!", use_container_width=True)
+
+    if run_scan:
+        if uploaded_page is not None:
+            recipe_text = recipe_text_from_html(uploaded_page.getvalue().decode("utf-8", errors="replace"))
+        elif looks_like_html(recipe_text):
+            recipe_text = recipe_text_from_html(recipe_text)
+
+        if not recipe_text.strip():
+            st.warning("Please enter a recipe before running the scan.")
+            st.session_state.scan_results = None
+        else:
+            st.session_state.score_mode = "exposure" if weigh_by_quantity else "count"
+            st.session_state.recipe_text_state = recipe_text
+            st.session_state.scan_results = None
+            if st.session_state.analysis_task is not None:
+                st.session_state.analysis_task.cancel()
+            task = start_scan_task(recipe_text, st.session_state.score_mode)
+            if task is None:
+                st.session_state.scan_results = analyze_with_store(recipe_text, st.session_state.score_mode)
+            elif task.wait(QUICK_SCAN_SECONDS):
+                finish_scan_task(task)
+            else:
+                st.session_state.analysis_task = task
+
+if st.session_state.analysis_task is not None:
+    render_analysis_progress()
 
 # Display results if they exist in session state
 if st.session_state.scan_results:
@@ -637,83 +1046,12 @@ if st.session_state.scan_results:
     if "error" in results:
         st.error(results["error"])
     else:
-        categorized = results.get("categorized", {})
-        total_score = results.get("total_score", 0)
-        all_ingredients = results.get("all_ingredients", {})
-
-        st.metric("Total Risk Score", str(total_score))
-
-        st.divider()
-        
-        all_ingredients_dict, unknown_ingredients = build_all_ingredients_cards(all_ingredients)
+        unknown_ingredients = render_results_view(results)
         
         if unknown_ingredients:
-            st.divider()
-            st.markdown("### Categorize Unknown Ingredients")
-            st.markdown("Select unknown ingredients and assign them to a risk category:")
-            
-            cols = st.columns(2)
-            checkbox_states = {}
-            
-            for i, ingredient in enumerate(sorted(unknown_ingredients)):
-                with cols[i % 2]:
-                    checkbox_states[ingredient] = st.checkbox(ingredient.title(), key=f"unknown_{ingredient}")
-            
-            selected_ingredients = [ing for ing, selected in checkbox_states.items() if selected]
-            
-            if selected_ingredients:
-                st.markdown("**Assign category:**")
-                category_cols = st.columns(4)
-                
-                with category_cols[0]:
-                    if st.button("🟢 Safe", key="btn_safe", use_container_width=True):
-                        added_count = 0
-                        for ingredient in selected_ingredients:
-                            if add_food_item("Food_Map_Levels.xlsx", ingredient, 0):
-                                added_count += 1
-                        if added_count > 0:
-                            st.success(f"Added {added_count} ingredient(s) as Safe!")
-                            results = analyze_recipe(st.session_state.recipe_text_state, excel_path="Food_Map_Levels.xlsx")
-                            st.session_state.scan_results = results
-                            st.rerun()
-                
-                with category_cols[1]:
-                    if st.button("🟡 Moderation", key="btn_mod", use_container_width=True):
-                        added_count = 0
-                        for ingredient in selected_ingredients:
-                            if add_food_item("Food_Map_Levels.xlsx", ingredient, 1):
-                                added_count += 1
-                        if added_count > 0:
-                            st.success(f"Added {added_count} ingredient(s) as Moderation!")
-                            results = analyze_recipe(st.session_state.recipe_text_state, excel_path="Food_Map_Levels.xlsx")
-                            st.session_state.scan_results = results
-                            st.rerun()
-                
-                with category_cols[2]:
-                    if st.button("🔴 Avoid", key="btn_avoid", use_container_width=True):
-                        added_count = 0
-                        for ingredient in selected_ingredients:
-                            if add_food_item("Food_Map_Levels.xlsx", ingredient, 2):
-                                added_count += 1
-                        if added_count > 0:
-                            st.success(f"Added {added_count} ingredient(s) as Avoid!")
-                            results = analyze_recipe(st.session_state.recipe_text_state, excel_path="Food_Map_Levels.xlsx")
-                            st.session_state.scan_results = results
-                            st.rerun()
-                
-                with category_cols[3]:
-                    if st.button("❌ Never", key="btn_never", use_container_width=True):
-                        added_count = 0
-                        for ingredient in selected_ingredients:
-                            if add_food_item("Food_Map_Levels.xlsx", ingredient, 3):
-                                added_count += 1
-                        if added_count > 0:
-                            st.success(f"Added {added_count} ingredient(s) as Never!")
-                            results = analyze_recipe(st.session_state.recipe_text_state, excel_path="Food_Map_Levels.xlsx")
-                            st.session_state.scan_results = results
-                            st.rerun()
+            render_categorize_panel(unknown_ingredients)
         
         st.divider()
-        st.markdown(build_results_markdown(categorized))
+        st.markdown(build_results_markdown(results.get("categorized", {})))
         st.markdown("<div class='dino-divider'></div>", unsafe_allow_html=True)
 
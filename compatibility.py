@@ -0,0 +1,249 @@
+"""
+Compatibility Matrix - Recipes × Restriction Profiles
+Resolves every ingredient stored in the library against each person's
+restriction profile with the regular matcher, encodes the recipes as bitsets
+over the food items their ingredients resolve to, and computes the worst level
+and total score of each recipe/profile pair with vectorized NumPy operations.
+
+Profiles are xlsx or CSV files in the food map layout (item, level, notes);
+items a profile doesn't list keep their level from the shared food map.
+Profile items no stored ingredient resolves to are reported, not assumed safe.
+
+Usage:
+    python compatibility.py profiles/ --export matrix.csv --metric worst
+    python compatibility.py alice.csv bob.xlsx --safe-for alice --max-level 1
+"""
+
+import argparse
+import csv
+import os
+import pathlib
+import sqlite3
+import sys
+from contextlib import closing
+
+import numpy as np
+
+from food_map_import import iter_source_rows, parse_level
+from recipe_checker_simple import build_match_index, clean_food_item_name, load_food_map, match_ingredient
+from recipe_library import DEFAULT_LIBRARY_PATH
+
+
+PROFILE_EXTENSIONS = ('.xlsx', '.xlsm', '.csv')
+SCORED_LEVELS = (1, 2, 3)
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(words):
+        return np.bitwise_count(words)
+else:
+    _BYTE_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        # NumPy < 2.0 has no bitwise_count; count bits per byte through a lookup table
+        return _BYTE_POPCOUNT[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def pack_bits(matrix):
+    """Pack a 2-D boolean matrix into rows of uint64 words."""
+    packed = np.packbits(matrix, axis=1, bitorder='little')
+    padding = -packed.shape[1] % 8
+    if padding:
+        packed = np.pad(packed, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def load_profile(path):
+    """Read a restriction profile into {food item: level}; rows without a valid level are skipped."""
+    profile = {}
+    for raw_item, raw_level, _ in iter_source_rows(path):
+        level = parse_level(raw_level)
+        if level is None or raw_item in (None, ''):
+            continue
+        profile[clean_food_item_name(raw_item).lower()] = level
+    return profile
+
+
+def load_profiles(paths):
+    """Load profiles from files or directories of them, named by file name without extension."""
+    profiles = {}
+    for path in paths:
+        file_paths = [path]
+        if os.path.isdir(path):
+            file_paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        for file_path in file_paths:
+            if file_path.lower().endswith(PROFILE_EXTENSIONS):
+                profiles[os.path.splitext(os.path.basename(file_path))[0]] = load_profile(file_path)
+    return profiles
+
+
+class CompatibilityMatrix:
+    """Worst level and total score for every stored recipe under every profile.
+
+    Results equal analyze_recipe's for each recipe against the shared food map with the
+    profile's entries applied over it (or against the profile alone without inherit).
+    """
+
+    def __init__(self, recipe_ids, recipe_names, ingredients, entry_rows, entry_columns, food_map):
+        self.recipe_ids = recipe_ids
+        self.recipe_names = recipe_names
+        self.ingredients = ingredients
+        self.entry_rows = entry_rows
+        self.entry_columns = entry_columns
+        self.food_map = food_map
+        self.profile_names = []
+        self.unmatched_items = {}
+        self.worst = np.zeros((len(recipe_ids), 0), dtype=np.int8)
+        self.scores = np.zeros((len(recipe_ids), 0), dtype=np.int32)
+
+    @classmethod
+    def from_library(cls, db_path=DEFAULT_LIBRARY_PATH, excel_path='Food_Map_Levels.xlsx', food_map=None):
+        """Collect every recipe's extracted ingredients, matched or not, from the library."""
+        if food_map is None:
+            food_map = load_food_map(excel_path)
+        try:
+            # Open read-only so a mistyped path is reported instead of creating an empty library
+            with closing(sqlite3.connect(pathlib.Path(db_path).absolute().as_uri() + '?mode=ro', uri=True)) as conn:
+                recipes = conn.execute('SELECT id, name FROM recipes ORDER BY id').fetchall()
+                rows = conn.execute('SELECT recipe_id, ingredient FROM recipe_ingredients').fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading recipe library {db_path}: {e}")
+            recipes, rows = [], []
+
+        recipe_rows = {recipe_id: row for row, (recipe_id, _) in enumerate(recipes)}
+        ingredients = sorted({ingredient for _, ingredient in rows})
+        ingredient_ids = {ingredient: column for column, ingredient in enumerate(ingredients)}
+        return cls(
+            np.array([recipe_id for recipe_id, _ in recipes], dtype=np.int64),
+            [name for _, name in recipes],
+            ingredients,
+            np.array([recipe_rows[recipe_id] for recipe_id, _ in rows], dtype=np.int64),
+            np.array([ingredient_ids[ingredient] for _, ingredient in rows], dtype=np.int64),
+            food_map or {},
+        )
+
+    def profile_food_map(self, profile, inherit=True):
+        """The food map a profile is matched against: its entries over the shared map, or alone without inherit."""
+        food_map = dict(self.food_map) if inherit else {}
+        for food_item, level in profile.items():
+            food_map[food_item] = {'level': level, 'notes': ''}
+        return food_map
+
+    def profile_bits(self, profile, inherit=True):
+        """Resolve every stored ingredient under a profile.
+
+        Returns (bits, levels, found_keys): a recipe × food-item bitset over the distinct
+        found_items keys the ingredients resolve to, the level of each of those items, and the
+        keys themselves. Like analyze_recipe, ingredients resolving to one key count once.
+        """
+        food_map = self.profile_food_map(profile, inherit)
+        index = build_match_index(food_map)
+        found_keys = {}
+        levels = []
+        item_of_column = np.full(len(self.ingredients), -1, dtype=np.int64)
+        for column, ingredient in enumerate(self.ingredients):
+            found_key, result = match_ingredient(ingredient, food_map, index=index)
+            if found_key is None:
+                continue
+            if found_key not in found_keys:
+                found_keys[found_key] = len(found_keys)
+                levels.append(result['level'])
+            item_of_column[column] = found_keys[found_key]
+
+        items = item_of_column[self.entry_columns]
+        resolved = items >= 0
+        present = np.zeros((len(self.recipe_ids), len(found_keys)), dtype=bool)
+        present[self.entry_rows[resolved], items[resolved]] = True
+        return pack_bits(present), np.array(levels, dtype=np.int8), list(found_keys)
+
+    def compute(self, profiles, inherit=True):
+        """Compute worst level and total score for every recipe under each of {name: profile}."""
+        self.profile_names = list(profiles)
+        self.unmatched_items = {}
+        self.worst = np.zeros((len(self.recipe_ids), len(profiles)), dtype=np.int8)
+        self.scores = np.zeros((len(self.recipe_ids), len(profiles)), dtype=np.int32)
+
+        for column, (name, profile) in enumerate(profiles.items()):
+            bits, levels, found_keys = self.profile_bits(profile, inherit)
+            self.unmatched_items[name] = sorted(set(profile) - set(found_keys))
+            masks = pack_bits(np.stack([levels == level for level in SCORED_LEVELS]).reshape(len(SCORED_LEVELS), -1))
+            for mask, level in zip(masks, SCORED_LEVELS):
+                hits = _popcount(bits & mask).sum(axis=1, dtype=np.int32)
+                self.scores[:, column] += hits * level
+                self.worst[hits > 0, column] = level
+        return self
+
+    def safe_recipes(self, profile_name, max_level=1, max_score=None):
+        """Recipes whose worst level under a profile is at most max_level, safest first."""
+        column = self.profile_names.index(profile_name)
+        worst = self.worst[:, column]
+        scores = self.scores[:, column]
+        keep = worst <= max_level
+        if max_score is not None:
+            keep &= scores <= max_score
+        rows = np.nonzero(keep)[0]
+        rows = rows[np.lexsort((scores[rows], worst[rows]))]
+        return [
+            {'id': int(self.recipe_ids[row]), 'name': self.recipe_names[row],
+             'worst_level': int(worst[row]), 'total_score': int(scores[row])}
+            for row in rows
+        ]
+
+    def export_csv(self, path, metric='worst'):
+        """Write one row per recipe and one column per profile holding the worst level or the score."""
+        values = self.worst if metric == 'worst' else self.scores
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['recipe_id', 'recipe'] + self.profile_names)
+            for row, recipe_id in enumerate(self.recipe_ids):
+                writer.writerow([int(recipe_id), self.recipe_names[row]] + values[row].tolist())
+
+    def export_npz(self, path):
+        """Save the full matrices (and their labels) as a NumPy .npz archive."""
+        np.savez_compressed(path, recipe_ids=self.recipe_ids, recipe_names=np.array(self.recipe_names),
+                            profiles=np.array(self.profile_names), worst=self.worst, scores=self.scores)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute the recipe × profile compatibility matrix.')
+    parser.add_argument('profiles', nargs='+', help='profile xlsx/CSV files or directories of them')
+    parser.add_argument('--library', default=DEFAULT_LIBRARY_PATH)
+    parser.add_argument('--excel', default='Food_Map_Levels.xlsx', help='shared food map profiles inherit from')
+    parser.add_argument('--no-inherit', action='store_true', help='match against the profile alone, not the shared map')
+    parser.add_argument('--export', help='write the matrix to this .csv or .npz file')
+    parser.add_argument('--metric', choices=('worst', 'score'), default='worst', help='value exported to CSV')
+    parser.add_argument('--safe-for', help='list recipes acceptable for this profile')
+    parser.add_argument('--max-level', type=int, default=1, help='worst level allowed with --safe-for')
+    parser.add_argument('--max-score', type=int, help='highest total score allowed with --safe-for')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.library):
+        print(f"Error: recipe library {args.library} not found")
+        return 1
+    profiles = load_profiles(args.profiles)
+    if not profiles:
+        print("Error: no profiles found")
+        return 1
+    matrix = CompatibilityMatrix.from_library(args.library, args.excel).compute(profiles, inherit=not args.no_inherit)
+    print(f"Recipes: {len(matrix.recipe_ids)}  Ingredients: {len(matrix.ingredients)}  Profiles: {len(profiles)}")
+    for name, items in matrix.unmatched_items.items():
+        if items:
+            print(f"  {name}: no stored ingredient matches {', '.join(items)}")
+
+    if args.export:
+        if args.export.lower().endswith('.npz'):
+            matrix.export_npz(args.export)
+        else:
+            matrix.export_csv(args.export, args.metric)
+        print(f"Wrote {args.export}")
+
+    if args.safe_for:
+        if args.safe_for not in profiles:
+            print(f"Error: unknown profile '{args.safe_for}'")
+            return 1
+        for recipe in matrix.safe_recipes(args.safe_for, args.max_level, args.max_score):
+            print(f"{recipe['total_score']:>5}  {recipe['name']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
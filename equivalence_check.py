@@ -0,0 +1,245 @@
+"""
+Equivalence Check - Golden Corpus Harness
+Runs a corpus of real and generated recipes through the legacy matching engine
+and a candidate engine side by side, reports every semantic difference in
+found_items, all_ingredients and total_score, and the speedup ratio.
+
+Usage:
+    python equivalence_check.py --generated 2000
+    python equivalence_check.py --candidate mymodule:parse_recipe --corpus saved_pages/ --library recipe_library.db
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+import legacy_engine
+import recipe_checker_simple
+from load_test import generate_recipe
+from recipe_checker_simple import calculate_total_risk_score, load_food_map
+from recipe_importer import import_recipe_file, looks_like_html, recipe_text_from_html
+
+
+ENGINES = {
+    'legacy': legacy_engine.parse_recipe,
+    'current': recipe_checker_simple.parse_recipe,
+}
+
+# Fragments that exercise the extraction and matching quirks the engines must agree on
+EDGE_CASE_TEMPLATES = [
+    '{a}, {b}, {c}',
+    'Ingredients: {a}, {b} or {c}',
+    '{a}\n{b} or {c}\n{d} (optional)',
+    'INGREDIENTS\n2 cups {a}\n1/2 tsp {b}\n▢ 3 cloves {c}\nDirections: mix {d}',
+    '1 lb {a}, cut (about 2 {b} or {c})\nsalt to taste\n{d} as needed',
+    'Print\nSave\n{a}\n{b}\nSee all nutritional information',
+    '{a} corn\n{b}\nCornmeal\n{c} and {d}',
+    '1-2 tbsp {a}\n½ cup {b}\n{c}.\n{d}!',
+    'Or {a}\nor {b}\n{c} OR {d}',
+    'Method: {a}\nsteps {b}\nRecipe {c}\n{d}',
+    '{a} {b}\n{c} {d}\n{a}\n{a}',
+]
+
+
+def resolve_engine(spec):
+    """Resolve 'legacy', 'current' or 'module:function' to a (recipe_text, food_map) engine."""
+    if spec in ENGINES:
+        return ENGINES[spec]
+    module_name, _, function_name = spec.partition(':')
+    if not function_name:
+        raise ValueError(f"Engine '{spec}' must be 'legacy', 'current' or 'module:function'")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def generate_corpus(food_map, count, seed=0):
+    """Generate recipes from food-map items, unknown words and edge-case templates."""
+    rng = random.Random(seed)
+    food_items = list(food_map)
+    names = food_items + ['chicken breast', 'unsalted butter', 'fresh basil', 'sea salt', 'brown rice',
+                          'corn tortillas', 'garlic powder', 'heavy cream', 'x', 'a']
+    corpus = []
+    for i in range(count):
+        if i % 3 == 0:
+            template = rng.choice(EDGE_CASE_TEMPLATES)
+            corpus.append((f'edge-{i}', template.format(**{k: rng.choice(names) for k in 'abcd'})))
+        else:
+            size = rng.choice(('small', 'small', 'medium', 'large'))
+            corpus.append((f'generated-{i}', generate_recipe(rng, food_items, size)))
+    return corpus
+
+
+def load_corpus_path(path):
+    """Load recipes from a .txt/.html file, a directory of them, or a JSONL file with 'text' fields."""
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+
+    corpus = []
+    for file_path in paths:
+        lower = file_path.lower()
+        if lower.endswith(('.html', '.htm')):
+            parsed = import_recipe_file(file_path)
+            if parsed:
+                corpus.append((file_path, parsed['text']))
+        elif lower.endswith('.jsonl'):
+            with open(file_path, encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    text = record.get('text') or record.get('recipe_text') if isinstance(record, dict) else None
+                    if text:
+                        corpus.append((f'{file_path}:{line_number}', text))
+        elif lower.endswith('.txt'):
+            with open(file_path, encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            corpus.append((file_path, recipe_text_from_html(text) if looks_like_html(text) else text))
+    return corpus
+
+
+def load_library_corpus(db_path):
+    """Load every stored recipe text from a recipe library database."""
+    try:
+        with closing(sqlite3.connect(db_path)) as conn:
+            return [(f'library-{row[0]}', row[1]) for row in conn.execute('SELECT id, recipe_text FROM recipes ORDER BY id')]
+    except sqlite3.Error as e:
+        print(f"Error reading recipe library {db_path}: {e}")
+        return []
+
+
+def _diff_dicts(label, expected, actual):
+    differences = []
+    for key in expected.keys() - actual.keys():
+        differences.append(f"{label}: missing {key!r} (expected {expected[key]})")
+    for key in actual.keys() - expected.keys():
+        differences.append(f"{label}: unexpected {key!r} = {actual[key]}")
+    for key in expected.keys() & actual.keys():
+        if expected[key] != actual[key]:
+            differences.append(f"{label}[{key!r}]: expected {expected[key]}, got {actual[key]}")
+    if not differences and list(expected) != list(actual):
+        differences.append(f"{label}: same entries in a different order")
+    return differences
+
+
+def diff_results(expected, actual):
+    """List every semantic difference between two (found_items, all_ingredients) results."""
+    expected_found, expected_all = expected
+    actual_found, actual_all = actual
+    differences = _diff_dicts('found_items', expected_found, actual_found)
+    differences.extend(_diff_dicts('all_ingredients', expected_all, actual_all))
+    expected_score = calculate_total_risk_score(expected_found)
+    actual_score = calculate_total_risk_score(actual_found)
+    if expected_score != actual_score:
+        differences.append(f"total_score: expected {expected_score}, got {actual_score}")
+    return differences
+
+
+def run_engine(engine, corpus, food_map):
+    """Run an engine over the corpus. Returns (results, seconds); exceptions become results."""
+    results = []
+    start = time.perf_counter()
+    for _, text in corpus:
+        try:
+            results.append(engine(text, food_map))
+        except Exception as e:
+            results.append(e)
+    return results, time.perf_counter() - start
+
+
+def compare_engines(corpus, food_map, reference='legacy', candidate='current', repeat=1):
+    """Compare two engines over a corpus and return a report dict."""
+    reference_engine = resolve_engine(reference)
+    candidate_engine = resolve_engine(candidate)
+
+    # Warm up regex caches and lazy initialization so the timings compare steady state
+    run_engine(reference_engine, corpus[:20], food_map)
+    run_engine(candidate_engine, corpus[:20], food_map)
+
+    reference_seconds = candidate_seconds = 0.0
+    for _ in range(max(1, repeat)):
+        reference_results, seconds = run_engine(reference_engine, corpus, food_map)
+        reference_seconds += seconds
+        candidate_results, seconds = run_engine(candidate_engine, corpus, food_map)
+        candidate_seconds += seconds
+
+    mismatches = []
+    for (name, text), expected, actual in zip(corpus, reference_results, candidate_results):
+        if isinstance(expected, Exception) or isinstance(actual, Exception):
+            if type(expected) is not type(actual) or str(expected) != str(actual):
+                mismatches.append({'recipe': name, 'text': text,
+                                   'differences': [f"exception: expected {expected!r}, got {actual!r}"]})
+            continue
+        differences = diff_results(expected, actual)
+        if differences:
+            mismatches.append({'recipe': name, 'text': text, 'differences': differences})
+
+    return {
+        'reference': reference,
+        'candidate': candidate,
+        'recipes': len(corpus),
+        'mismatched_recipes': len(mismatches),
+        'reference_seconds': round(reference_seconds, 4),
+        'candidate_seconds': round(candidate_seconds, 4),
+        'speedup': round(reference_seconds / candidate_seconds, 3) if candidate_seconds else None,
+        'mismatches': mismatches,
+    }
+
+
+def print_report(report, max_shown=20):
+    """Print a human-readable summary with the first mismatches."""
+    print(f"Reference: {report['reference']}  Candidate: {report['candidate']}  Recipes: {report['recipes']}")
+    print(f"Time: {report['reference_seconds']}s vs {report['candidate_seconds']}s  Speedup: {report['speedup']}x")
+    if not report['mismatches']:
+        print("No semantic differences.")
+        return
+    print(f"{report['mismatched_recipes']} recipe(s) differ:")
+    for mismatch in report['mismatches'][:max_shown]:
+        print(f"\n--- {mismatch['recipe']}")
+        print('    ' + mismatch['text'].replace('\n', '\n    ')[:500])
+        for difference in mismatch['differences']:
+            print(f"  * {difference}")
+    if report['mismatched_recipes'] > max_shown:
+        print(f"\n... and {report['mismatched_recipes'] - max_shown} more")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check a matching engine against the legacy implementation.')
+    parser.add_argument('--reference', default='legacy', help="'legacy', 'current' or module:function")
+    parser.add_argument('--candidate', default='current', help="'legacy', 'current' or module:function")
+    parser.add_argument('--excel', default='Food_Map_Levels.xlsx')
+    parser.add_argument('--generated', type=int, default=1000, help='number of generated recipes')
+    parser.add_argument('--corpus', action='append', default=[], help='file or directory of real recipes')
+    parser.add_argument('--library', help='also check every recipe stored in this library database')
+    parser.add_argument('--repeat', type=int, default=1, help='timing repetitions')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the full report to this JSON file')
+    args = parser.parse_args(argv)
+
+    food_map = load_food_map(args.excel)
+    if not food_map:
+        print("Error: Could not load food map")
+        return 2
+
+    corpus = generate_corpus(food_map, args.generated, args.seed)
+    for path in args.corpus:
+        corpus.extend(load_corpus_path(path))
+    if args.library:
+        corpus.extend(load_library_corpus(args.library))
+
+    report = compare_engines(corpus, food_map, args.reference, args.candidate, args.repeat)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Food Map Import - Bulk Allergen Database Merge
+Streams large xlsx or CSV allergen lists row by row and merges them into the
+food map through the edit journal, with a conflict policy for items that
+already exist.
+
+Usage:
+    python food_map_import.py allergens.csv --policy keep-max
+    python food_map_import.py big_list.xlsx --policy overwrite --item-column 0 --level-column 2
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+import tracemalloc
+
+import openpyxl
+
+from recipe_checker_simple import (
+    _clean_aliases,
+    _resolve_existing_key,
+    append_journal_entries,
+    apply_journal_entry,
+    clean_food_item_name,
+    compact_food_map,
+    journal_timestamp,
+    load_food_map,
+)
+
+
+CONFLICT_POLICIES = ('keep-max', 'overwrite', 'skip')
+VALID_LEVELS = (0, 1, 2, 3)
+JOURNAL_BATCH_SIZE = 5000
+
+
+def parse_level(value):
+    """Convert a spreadsheet or CSV cell to a level 0-3, or None if it isn't one."""
+    if value is None or value == '':
+        return None
+    try:
+        level = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return level if level in VALID_LEVELS else None
+
+
+def iter_source_rows(source_path, item_column=0, level_column=1, notes_column=2):
+    """Stream raw (item, level value, notes) rows from an xlsx or CSV file, one row at a time."""
+    width = max(item_column, level_column, notes_column if notes_column is not None else 0) + 1
+
+    if source_path.lower().endswith(('.xlsx', '.xlsm')):
+        wb = openpyxl.load_workbook(source_path, read_only=True, data_only=True)
+        try:
+            for row in wb.active.iter_rows(max_col=width, values_only=True):
+                row = tuple(row) + (None,) * (width - len(row))
+                yield row[item_column], row[level_column], row[notes_column] if notes_column is not None else None
+        finally:
+            wb.close()
+        return
+
+    with open(source_path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        for row in csv.reader(f):
+            row = row + [None] * (width - len(row))
+            yield row[item_column], row[level_column], row[notes_column] if notes_column is not None else None
+
+
+def resolve_conflict(policy, current, level, notes):
+    """Return the (level, notes) to store for an existing item, or None to leave it unchanged."""
+    if policy == 'skip':
+        return None
+    if policy == 'keep-max':
+        if level < current['level']:
+            return None
+        if level == current['level']:
+            notes = notes or current['notes']
+    if level == current['level'] and notes == current['notes']:
+        return None
+    return level, notes
+
+
+def import_food_database(source_path, excel_path='Food_Map_Levels.xlsx', policy='keep-max', item_column=0,
+                         level_column=1, notes_column=2, compact=True):
+    """Merge an external allergen list into the food map. Returns counts of what happened to each row."""
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy '{policy}', expected one of {', '.join(CONFLICT_POLICIES)}")
+
+    summary = {'rows': 0, 'added': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'invalid': 0}
+    food_map = load_food_map(excel_path)
+    if not food_map:
+        summary['error'] = 'Could not load food map'
+        return summary
+    # Workbook rows keep their raw names ("Peanuts (roasted)"); match them the way add_food_item does
+    aliases = _clean_aliases(food_map)
+
+    pending = []
+    for raw_item, raw_level, raw_notes in iter_source_rows(source_path, item_column, level_column, notes_column):
+        summary['rows'] += 1
+        level = parse_level(raw_level)
+        food_item = clean_food_item_name(raw_item) if raw_item not in (None, '') else ''
+        if level is None or not food_item:
+            # Header rows and blank lines land here too
+            summary['invalid'] += 1
+            continue
+
+        notes = str(raw_notes).strip() if raw_notes not in (None, '') else ''
+        existing = _resolve_existing_key(food_map, food_item.lower(), aliases)
+        current = food_map[existing] if existing is not None else None
+        if current is None:
+            new_values = (level, notes)
+            summary['added'] += 1
+        else:
+            new_values = resolve_conflict(policy, current, level, notes)
+            if new_values is None:
+                summary['skipped' if policy == 'skip' else 'unchanged'] += 1
+                continue
+            summary['updated'] += 1
+
+        entry = {
+            'timestamp': journal_timestamp(),
+            'item': food_item,
+            'old_level': current['level'] if current else None,
+            'new_level': new_values[0],
+            'old_notes': current['notes'] if current else '',
+            'notes': new_values[1],
+            'source': os.path.basename(source_path),
+        }
+        pending.append(entry)
+        apply_journal_entry(food_map, entry, aliases)
+        if len(pending) >= JOURNAL_BATCH_SIZE:
+            append_journal_entries(excel_path, pending)
+            pending = []
+
+    if pending:
+        append_journal_entries(excel_path, pending)
+    if compact and (summary['added'] or summary['updated']):
+        compact_food_map(excel_path)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merge an xlsx or CSV allergen database into the food map.')
+    parser.add_argument('source', help='xlsx or CSV file to import')
+    parser.add_argument('--excel', default='Food_Map_Levels.xlsx', help='food map workbook to merge into')
+    parser.add_argument('--policy', choices=CONFLICT_POLICIES, default='keep-max',
+                        help='what to do when an item already exists')
+    parser.add_argument('--item-column', type=int, default=0, help='zero-based column holding the item name')
+    parser.add_argument('--level-column', type=int, default=1, help='zero-based column holding the level (0-3)')
+    parser.add_argument('--notes-column', type=int, default=2, help='zero-based notes column, -1 for none')
+    parser.add_argument('--no-compact', action='store_true', help='leave the edits in the journal')
+    parser.add_argument('--profile', action='store_true', help='report elapsed time and peak traced memory')
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        tracemalloc.start()
+    start = time.perf_counter()
+    summary = import_food_database(
+        args.source,
+        excel_path=args.excel,
+        policy=args.policy,
+        item_column=args.item_column,
+        level_column=args.level_column,
+        notes_column=None if args.notes_column < 0 else args.notes_column,
+        compact=not args.no_compact,
+    )
+    elapsed = time.perf_counter() - start
+
+    if 'error' in summary:
+        print(f"Error: {summary['error']}")
+        return 1
+    print(f"Rows: {summary['rows']}  Added: {summary['added']}  Updated: {summary['updated']}  "
+          f"Unchanged: {summary['unchanged']}  Skipped: {summary['skipped']}  Invalid: {summary['invalid']}")
+    if args.profile:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Elapsed: {elapsed:.2f}s  Peak traced memory: {peak / 1024 / 1024:.1f} MiB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
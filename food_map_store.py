@@ -0,0 +1,85 @@
+"""
+Food Map Store - Double-Buffered Food Map and Match Index
+Keeps a ready-to-use food map and matching index in memory. A watcher thread
+notices when the workbook or its edit journal changes, builds the new version
+off the request path and swaps it in atomically, so requests never wait for a
+rebuild.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from recipe_checker_simple import build_match_index, food_map_version, load_food_map
+
+
+FoodMapSnapshot = namedtuple('FoodMapSnapshot', 'version food_map index built_at build_seconds')
+
+
+class FoodMapStore:
+    """Serves the latest fully built food map snapshot and rebuilds it in the background."""
+
+    def __init__(self, excel_path='Food_Map_Levels.xlsx', poll_interval=2.0):
+        self.excel_path = excel_path
+        self.poll_interval = poll_interval
+        self.rebuilds = 0
+        self.failed_rebuilds = 0
+        self._snapshot = None
+        self._build_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _build(self):
+        # Read the version first: if the files change mid-build, the next poll sees a newer one
+        version = food_map_version(self.excel_path)
+        started = time.perf_counter()
+        food_map = load_food_map(self.excel_path)
+        if not food_map:
+            return None
+        index = build_match_index(food_map)
+        return FoodMapSnapshot(version, food_map, index, time.time(), time.perf_counter() - started)
+
+    def refresh(self, force=False):
+        """Rebuild now if the workbook changed (or always with force). Returns the current snapshot."""
+        with self._build_lock:
+            current = self._snapshot
+            if not force and current is not None and current.version == food_map_version(self.excel_path):
+                return current
+            snapshot = self._build()
+            if snapshot is None:
+                self.failed_rebuilds += 1
+                return current
+            # A single attribute assignment, so readers see either the old or the new snapshot
+            self._snapshot = snapshot
+            self.rebuilds += 1
+            return snapshot
+
+    def current(self):
+        """Return the latest snapshot, building it only if none exists yet. May be None if the map cannot load."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.failed_rebuilds += 1
+                print(f"Error rebuilding food map: {e}")
+
+    def start(self):
+        """Start the watcher thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name='food-map-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the watcher thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
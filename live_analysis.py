@@ -0,0 +1,116 @@
+"""
+Live Analysis - Line-Level Incremental Re-analysis
+Memoizes extraction per input line and matching per ingredient, so re-analyzing
+a recipe after an edit only processes the lines that changed.
+"""
+
+from recipe_checker_simple import (
+    build_analysis_result,
+    build_match_index,
+    collect_matches,
+    extract_line_ingredients,
+    food_map_version,
+    load_food_map,
+    match_ingredient,
+    uses_line_breaks,
+)
+
+
+class LineCache:
+    """Per-session memo of line extraction and ingredient match results."""
+
+    def __init__(self, max_lines=5000, max_ingredients=5000):
+        self.max_lines = max_lines
+        self.max_ingredients = max_ingredients
+        self.lines = {}
+        self.matches = {}
+        self.map_version = None
+        self.index = None
+        self.line_hits = 0
+        self.line_misses = 0
+        self.match_hits = 0
+        self.match_misses = 0
+
+    def reset_matches(self, map_version):
+        """Drop match results computed against an older food map."""
+        self.matches.clear()
+        self.map_version = map_version
+        self.index = None
+
+    def line_ingredients(self, line, use_line_breaks):
+        """Return the (ingredient, quantity) pairs on a line, extracting it only if unseen."""
+        key = (line.strip(), use_line_breaks)
+        cached = self.lines.get(key)
+        if cached is not None:
+            self.line_hits += 1
+            return cached
+
+        self.line_misses += 1
+        cached = extract_line_ingredients(line, use_line_breaks, with_quantities=True)
+        if len(self.lines) >= self.max_lines:
+            # Dicts keep insertion order, so this evicts the oldest line
+            del self.lines[next(iter(self.lines))]
+        self.lines[key] = cached
+        return cached
+
+    def match(self, ingredient, food_map, index=None):
+        """Return match_ingredient's result for an ingredient, matching it only if unseen."""
+        cached = self.matches.get(ingredient)
+        if cached is not None:
+            self.match_hits += 1
+            return cached
+
+        self.match_misses += 1
+        if index is None:
+            if self.index is None:
+                self.index = build_match_index(food_map)
+            index = self.index
+        cached = match_ingredient(ingredient, food_map, index=index)
+        if len(self.matches) >= self.max_ingredients:
+            del self.matches[next(iter(self.matches))]
+        self.matches[ingredient] = cached
+        return cached
+
+
+def analyze_incremental(recipe_text, food_map, cache, map_version=None, score_mode='count', index=None):
+    """Analyze a recipe like analyze_recipe, reusing cached results for unchanged lines and ingredients."""
+    if cache.map_version != map_version:
+        cache.reset_matches(map_version)
+    line_misses = cache.line_misses
+    match_misses = cache.match_misses
+
+    lines = recipe_text.split('\n')
+    use_line_breaks = uses_line_breaks(lines)
+    ingredient_quantities = []
+    for line in lines:
+        if line.strip():
+            ingredient_quantities.extend(cache.line_ingredients(line, use_line_breaks))
+
+    found_items, all_ingredients = collect_matches(
+        [ingredient for ingredient, _ in ingredient_quantities],
+        lambda ingredient: cache.match(ingredient, food_map, index)
+    )
+    results = build_analysis_result(found_items, all_ingredients, ingredient_quantities, food_map, score_mode)
+    results['changed_lines'] = cache.line_misses - line_misses
+    results['rematched_ingredients'] = cache.match_misses - match_misses
+    return results
+
+
+def analyze_live(recipe_text, cache, excel_path='Food_Map_Levels.xlsx', score_mode='count', store=None):
+    """Incrementally analyze a recipe against the current food map, like analyze_recipe.
+
+    With a FoodMapStore as store, the store's latest snapshot is used instead of loading the map.
+    """
+    snapshot = store.current() if store is not None else None
+    if snapshot is not None:
+        return analyze_incremental(recipe_text, snapshot.food_map, cache, snapshot.version, score_mode,
+                                   snapshot.index)
+    food_map = load_food_map(excel_path)
+    if not food_map:
+        return {
+            'error': 'Could not load food map',
+            'categorized': {},
+            'total_score': 0,
+            'all_ingredients': {}
+        }
+    return analyze_incremental(recipe_text, food_map, cache, food_map_version(excel_path), score_mode)
@@ -0,0 +1,350 @@
+"""
+Load Test - Simulated Concurrent Users
+Drives recipe analysis, categorize actions and library batch re-scoring from a
+pool of simulated users in threads or processes, and reports throughput,
+latency percentiles, errors and food-map file contention.
+
+Usage:
+    python load_test.py --users 16 --actions 50 --mode thread
+    python load_test.py --users 8 --mode process --mix analyze=60,categorize=30,batch=10
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import recipe_checker_simple
+from recipe_checker_simple import add_food_item, analyze_recipe, load_food_map
+from recipe_library import rescore_affected, save_recipe
+
+
+RECIPE_SIZES = {'small': (4, 8), 'medium': (12, 25), 'large': (50, 120)}
+DEFAULT_SIZE_MIX = {'small': 50, 'medium': 35, 'large': 15}
+DEFAULT_ACTION_MIX = {'analyze': 80, 'categorize': 10, 'batch': 10}
+MEASUREMENTS = ['1 cup', '2 cups', '1/2 cup', '1 tbsp', '2 tsp', '1 lb', '8 oz', '3 cloves', '1 pinch', '2', '']
+UNKNOWN_WORDS = ['zest', 'sprigs', 'fresh', 'dried', 'smoked', 'roasted', 'chopped', 'ground', 'toasted', 'wild']
+PAGE_CHROME = ['Print', 'Save', 'Bookmark', 'INGREDIENTS', 'Directions:', 'See all nutritional information']
+CONTENTION_MARKERS = ('locked', 'permission', 'zip', 'no such file', 'busy', 'resource temporarily')
+
+
+class ContentionCountingLock:
+    """Re-entrant lock that counts how often and how long callers had to wait for it."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self._lock.acquire(blocking=False):
+            return True
+        if not blocking:
+            return False
+        start = time.perf_counter()
+        acquired = self._lock.acquire(timeout=timeout)
+        with self._stats_lock:
+            self.waits += 1
+            self.wait_seconds += time.perf_counter() - start
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class ErrorLineCounter:
+    """Stdout wrapper counting the error lines the core functions print instead of raising."""
+
+    def __init__(self, stream, echo=False):
+        self.stream = stream
+        self.echo = echo
+        self.lock = threading.Lock()
+        self.errors = 0
+        self.contention = 0
+        self.messages = defaultdict(int)
+
+    def write(self, text):
+        for line in text.splitlines():
+            lowered = line.lower()
+            if not lowered.startswith(('error', 'skipping')):
+                continue
+            with self.lock:
+                self.errors += 1
+                self.messages[line[:120]] += 1
+                if any(marker in lowered for marker in CONTENTION_MARKERS):
+                    self.contention += 1
+        if self.echo:
+            self.stream.write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def parse_mix(text, defaults):
+    """Parse 'name=weight,name=weight' into a weight dict, keeping only known names."""
+    if not text:
+        return dict(defaults)
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in defaults:
+            raise ValueError(f"Unknown mix entry '{name}', expected one of {', '.join(defaults)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def weighted_choice(rng, mix):
+    names = list(mix)
+    return rng.choices(names, weights=[mix[name] for name in names])[0]
+
+
+def generate_recipe(rng, food_items, size):
+    """Build a realistic pasted recipe: known map items, unknown ingredients and some page chrome."""
+    low, high = RECIPE_SIZES[size]
+    lines = [rng.choice(PAGE_CHROME)]
+    for _ in range(rng.randint(low, high)):
+        roll = rng.random()
+        if roll < 0.7 and food_items:
+            name = rng.choice(food_items)
+        elif roll < 0.9:
+            name = f"{rng.choice(UNKNOWN_WORDS)} {rng.choice(food_items) if food_items else 'thyme'}"
+        else:
+            name = f"{rng.choice(UNKNOWN_WORDS)} loadtest{rng.randint(0, 500)}"
+        measurement = rng.choice(MEASUREMENTS)
+        lines.append(f"{measurement} {name}".strip())
+        if rng.random() < 0.05:
+            lines.append(rng.choice(PAGE_CHROME))
+    return '\n'.join(lines)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_action(action, rng, config, food_items):
+    """Run one simulated user action. Returns True on success."""
+    excel_path = config['excel_path']
+    if action == 'analyze':
+        recipe = generate_recipe(rng, food_items, weighted_choice(rng, config['size_mix']))
+        results = analyze_recipe(recipe, excel_path=excel_path)
+        if 'error' in results:
+            return False
+        if config['save']:
+            save_recipe(recipe, results, db_path=config['db_path'])
+        return True
+
+    if action == 'categorize':
+        item = f"loadtest{rng.randint(0, 500)}"
+        return add_food_item(excel_path, item, rng.randint(0, 3))
+
+    if action == 'batch':
+        items = rng.sample(food_items, min(3, len(food_items))) if food_items else []
+        rescore_affected(items, excel_path=excel_path, db_path=config['db_path'])
+        return True
+
+    raise ValueError(f"Unknown action '{action}'")
+
+
+def run_user(user_id, config):
+    """Simulate one user for a number of actions or until the deadline. Returns latency samples."""
+    rng = random.Random(config['seed'] + user_id)
+    food_items = list(load_food_map(config['excel_path']))
+    samples = []
+    deadline = config['deadline']
+    for _ in range(config['actions']):
+        if deadline and time.time() >= deadline:
+            break
+        action = weighted_choice(rng, config['action_mix'])
+        start = time.perf_counter()
+        try:
+            ok = run_action(action, rng, config, food_items)
+        except Exception as e:
+            print(f"Error in {action}: {type(e).__name__}: {e}")
+            ok = False
+        samples.append((action, time.perf_counter() - start, ok))
+        if config['think_time']:
+            time.sleep(rng.uniform(0, config['think_time']))
+    return samples
+
+
+def install_instrumentation(echo_errors=False):
+    """Swap in the contention-counting food map lock and the stdout error counter for this process."""
+    lock = ContentionCountingLock()
+    recipe_checker_simple._food_map_lock = lock
+    counter = ErrorLineCounter(sys.__stdout__, echo=echo_errors)
+    sys.stdout = counter
+    return lock, counter
+
+
+def _process_user(user_id, config):
+    lock, counter = install_instrumentation(config['echo_errors'])
+    samples = run_user(user_id, config)
+    return samples, {
+        'lock_waits': lock.waits,
+        'lock_wait_seconds': lock.wait_seconds,
+        'error_lines': counter.errors,
+        'io_contention': counter.contention,
+        'messages': dict(counter.messages),
+    }
+
+
+def run_load_test(config):
+    """Run all simulated users and return a report dict."""
+    samples = []
+    contention = {'lock_waits': 0, 'lock_wait_seconds': 0.0, 'error_lines': 0, 'io_contention': 0,
+                  'messages': defaultdict(int)}
+
+    start = time.perf_counter()
+    if config['mode'] == 'process':
+        with ProcessPoolExecutor(max_workers=config['users']) as pool:
+            futures = [pool.submit(_process_user, user_id, config) for user_id in range(config['users'])]
+            for future in futures:
+                user_samples, user_contention = future.result()
+                samples.extend(user_samples)
+                for key, value in user_contention.items():
+                    if key == 'messages':
+                        for message, count in value.items():
+                            contention['messages'][message] += count
+                    else:
+                        contention[key] += value
+    else:
+        original_lock, original_stdout = recipe_checker_simple._food_map_lock, sys.stdout
+        lock, counter = install_instrumentation(config['echo_errors'])
+        try:
+            with ThreadPoolExecutor(max_workers=config['users']) as pool:
+                futures = [pool.submit(run_user, user_id, config) for user_id in range(config['users'])]
+                for future in futures:
+                    samples.extend(future.result())
+        finally:
+            recipe_checker_simple._food_map_lock = original_lock
+            sys.stdout = original_stdout
+        contention.update({'lock_waits': lock.waits, 'lock_wait_seconds': lock.wait_seconds,
+                           'error_lines': counter.errors, 'io_contention': counter.contention})
+        contention['messages'].update(counter.messages)
+    elapsed = time.perf_counter() - start
+
+    return build_report(samples, contention, elapsed, config)
+
+
+def build_report(samples, contention, elapsed, config):
+    """Summarize latency samples per action and overall."""
+    by_action = defaultdict(list)
+    errors = defaultdict(int)
+    for action, latency, ok in samples:
+        by_action[action].append(latency)
+        if not ok:
+            errors[action] += 1
+
+    def summarize(latencies, error_count):
+        latencies = sorted(latencies)
+        return {
+            'count': len(latencies),
+            'errors': error_count,
+            'throughput_per_s': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+
+    return {
+        'mode': config['mode'],
+        'users': config['users'],
+        'elapsed_s': round(elapsed, 3),
+        'overall': summarize([latency for _, latency, _ in samples], sum(errors.values())),
+        'actions': {action: summarize(latencies, errors[action]) for action, latencies in sorted(by_action.items())},
+        'contention': {
+            'lock_waits': contention['lock_waits'],
+            'lock_wait_ms': round(contention['lock_wait_seconds'] * 1000, 2),
+            'error_lines': contention['error_lines'],
+            'io_contention_events': contention['io_contention'],
+            'top_messages': sorted(contention['messages'].items(), key=lambda kv: -kv[1])[:10],
+        },
+    }
+
+
+def print_report(report):
+    """Print a human-readable summary table."""
+    print(f"Mode: {report['mode']}  Users: {report['users']}  Elapsed: {report['elapsed_s']}s")
+    header = f"{'action':<12}{'count':>8}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print('-' * len(header))
+    rows = list(report['actions'].items()) + [('overall', report['overall'])]
+    for action, stats in rows:
+        print(f"{action:<12}{stats['count']:>8}{stats['errors']:>8}{stats['throughput_per_s']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    contention = report['contention']
+    print()
+    print(f"Food map lock waits: {contention['lock_waits']} ({contention['lock_wait_ms']} ms total)")
+    print(f"Error lines: {contention['error_lines']}  File contention events: {contention['io_contention_events']}")
+    for message, count in contention['top_messages']:
+        print(f"  {count:>5} × {message}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate concurrent users against the recipe checker.')
+    parser.add_argument('--users', type=int, default=8, help='number of simulated users')
+    parser.add_argument('--mode', choices=('thread', 'process'), default='thread')
+    parser.add_argument('--actions', type=int, default=25, help='actions per user')
+    parser.add_argument('--duration', type=float, default=0, help='stop every user after this many seconds')
+    parser.add_argument('--mix', default='', help='action weights, e.g. analyze=80,categorize=10,batch=10')
+    parser.add_argument('--sizes', default='', help='recipe size weights, e.g. small=50,medium=35,large=15')
+    parser.add_argument('--think-time', type=float, default=0.0, help='max random pause between actions (s)')
+    parser.add_argument('--excel', default='Food_Map_Levels.xlsx', help='food map to copy into the sandbox')
+    parser.add_argument('--no-save', action='store_true', help='do not store analyzed recipes in the library')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--echo-errors', action='store_true', help='also print error lines as they happen')
+    args = parser.parse_args(argv)
+
+    # Work on a copy so categorize actions never touch the real food map
+    workdir = tempfile.mkdtemp(prefix='recipe-load-test-')
+    try:
+        excel_path = os.path.join(workdir, os.path.basename(args.excel))
+        shutil.copy(args.excel, excel_path)
+        config = {
+            'users': args.users,
+            'mode': args.mode,
+            'actions': args.actions if not args.duration else sys.maxsize,
+            'deadline': time.time() + args.duration if args.duration else 0,
+            'action_mix': parse_mix(args.mix, DEFAULT_ACTION_MIX),
+            'size_mix': parse_mix(args.sizes, DEFAULT_SIZE_MIX),
+            'think_time': args.think_time,
+            'excel_path': excel_path,
+            'db_path': os.path.join(workdir, 'recipe_library.db'),
+            'save': not args.no_save,
+            'seed': args.seed,
+            'echo_errors': args.echo_errors,
+        }
+        report = run_load_test(config)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return report
+
+
+if __name__ == '__main__':
+    main()
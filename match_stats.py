@@ -0,0 +1,108 @@
+"""
+Match Statistics - Matching Tier Counters
+Records which parse_recipe tier resolves each ingredient, how many food-map
+entries were scanned before a hit, and the slowest ingredients.
+"""
+
+import heapq
+import json
+import threading
+
+
+MATCH_TIERS = ('corn', 'exact', 'word_boundary', 'core_equal', 'core_contains', 'unknown')
+SLOWEST_KEPT = 20
+
+
+class MatchStats:
+    """Per-call or cumulative counters for parse_recipe's matching tiers."""
+
+    def __init__(self, slowest_kept=SLOWEST_KEPT):
+        self.slowest_kept = slowest_kept
+        self.tier_hits = {tier: 0 for tier in MATCH_TIERS}
+        self.tier_comparisons = {tier: 0 for tier in MATCH_TIERS}
+        self.tier_seconds = {tier: 0.0 for tier in MATCH_TIERS}
+        self.ingredients = 0
+        self.comparisons = 0
+        self.max_comparisons = 0
+        self.entry_hits = {}
+        self.slowest = []
+        self._lock = threading.Lock()
+
+    def record(self, ingredient, tier, comparisons, seconds, food_item=None):
+        """Record how one ingredient was resolved."""
+        with self._lock:
+            self.ingredients += 1
+            self.tier_hits[tier] += 1
+            self.tier_comparisons[tier] += comparisons
+            self.tier_seconds[tier] += seconds
+            self.comparisons += comparisons
+            self.max_comparisons = max(self.max_comparisons, comparisons)
+            if food_item is not None and tier not in ('corn', 'exact'):
+                hits, scanned = self.entry_hits.get(food_item, (0, 0))
+                self.entry_hits[food_item] = (hits + 1, scanned + comparisons)
+            self._keep_slowest((seconds, ingredient, tier, comparisons))
+
+    def _keep_slowest(self, sample):
+        if len(self.slowest) < self.slowest_kept:
+            heapq.heappush(self.slowest, sample)
+        elif sample > self.slowest[0]:
+            heapq.heapreplace(self.slowest, sample)
+
+    def merge(self, other):
+        """Add another MatchStats' counters into this one."""
+        with self._lock:
+            for tier in MATCH_TIERS:
+                self.tier_hits[tier] += other.tier_hits[tier]
+                self.tier_comparisons[tier] += other.tier_comparisons[tier]
+                self.tier_seconds[tier] += other.tier_seconds[tier]
+            self.ingredients += other.ingredients
+            self.comparisons += other.comparisons
+            self.max_comparisons = max(self.max_comparisons, other.max_comparisons)
+            for food_item, (hits, scanned) in other.entry_hits.items():
+                total_hits, total_scanned = self.entry_hits.get(food_item, (0, 0))
+                self.entry_hits[food_item] = (total_hits + hits, total_scanned + scanned)
+            for sample in other.slowest:
+                self._keep_slowest(sample)
+
+    def reset(self):
+        """Clear all counters."""
+        fresh = MatchStats(self.slowest_kept)
+        with self._lock:
+            for name, value in vars(fresh).items():
+                if name != '_lock':
+                    setattr(self, name, value)
+
+    def to_dict(self, top_entries=10):
+        """Summarize the counters as plain JSON-serializable data."""
+        with self._lock:
+            ingredients = self.ingredients
+            expensive = sorted(self.entry_hits.items(), key=lambda kv: -kv[1][1])[:top_entries]
+            return {
+                'ingredients': ingredients,
+                'tier_hits': dict(self.tier_hits),
+                'tier_share': {tier: round(hits / ingredients, 4) if ingredients else 0.0
+                               for tier, hits in self.tier_hits.items()},
+                'tier_avg_comparisons': {tier: round(self.tier_comparisons[tier] / hits, 2) if hits else 0.0
+                                         for tier, hits in self.tier_hits.items()},
+                'tier_ms': {tier: round(seconds * 1000, 3) for tier, seconds in self.tier_seconds.items()},
+                'comparisons': self.comparisons,
+                'avg_comparisons': round(self.comparisons / ingredients, 2) if ingredients else 0.0,
+                'max_comparisons': self.max_comparisons,
+                'unknown_rate': round(self.tier_hits['unknown'] / ingredients, 4) if ingredients else 0.0,
+                'slowest': [
+                    {'ingredient': ingredient, 'tier': tier, 'comparisons': comparisons, 'ms': round(seconds * 1000, 3)}
+                    for seconds, ingredient, tier, comparisons in sorted(self.slowest, reverse=True)
+                ],
+                'expensive_entries': [
+                    {'food_item': food_item, 'hits': hits, 'entries_scanned': scanned}
+                    for food_item, (hits, scanned) in expensive
+                ],
+            }
+
+    def to_json(self, **kwargs):
+        """Export the summary as a JSON string."""
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+# Counters accumulated across every analyze_recipe call in this process
+CUMULATIVE_STATS = MatchStats()
@@ -0,0 +1,138 @@
+"""
+Meal Plan - Multi-Recipe Analysis
+Analyzes a set of recipes together: every recipe is extracted, each distinct
+ingredient across the set is matched against the food map exactly once, and
+per-recipe and combined exposure by level are reported with the plan's worst
+offenders.
+"""
+
+import re
+
+from recipe_checker_simple import (
+    build_analysis_result,
+    build_match_index,
+    collect_matches,
+    extract_all_ingredients,
+    ingredient_exposure,
+    load_food_map,
+    match_ingredient,
+)
+from match_stats import CUMULATIVE_STATS, MatchStats
+
+
+LEVELS = (0, 1, 2, 3)
+TITLE_PATTERN = re.compile(r'^\s*(?:#+|title:)\s*(.*)$', re.IGNORECASE)
+
+
+def exposure_by_level(all_ingredients, quantities):
+    """Split a recipe's exposure score by risk level (levels 1-3; level 0 never adds exposure)."""
+    by_level = {level: 0.0 for level in LEVELS[1:]}
+    for ingredient, info in all_ingredients.items():
+        exposure = ingredient_exposure(info, quantities.get(ingredient))
+        if exposure:
+            by_level[info['level']] += exposure
+    return {level: round(exposure, 2) for level, exposure in by_level.items()}
+
+
+def analyze_meal_plan(recipes, excel_path='Food_Map_Levels.xlsx', score_mode='count', food_map=None, index=None,
+                      top_offenders=10):
+    """Analyze several recipes as one plan.
+
+    recipes is a list of (name, recipe_text) pairs. Returns per-recipe analyze_recipe results
+    (each with an added exposure_by_level), the plan totals and the worst offenders: food-map
+    items ranked by level, then by combined exposure across the plan.
+    """
+    if food_map is None:
+        food_map = load_food_map(excel_path)
+    if not food_map:
+        return {'error': 'Could not load food map', 'recipes': [], 'offenders': []}
+    if index is None:
+        index = build_match_index(food_map)
+
+    stats = MatchStats()
+    matches = {}
+
+    def match_once(ingredient):
+        cached = matches.get(ingredient)
+        if cached is None:
+            cached = matches[ingredient] = match_ingredient(ingredient, food_map, stats, index)
+        return cached
+
+    recipe_results = []
+    offenders = {}
+    total_lines = 0
+    for name, recipe_text in recipes:
+        ingredient_quantities = extract_all_ingredients(recipe_text, with_quantities=True)
+        total_lines += len(ingredient_quantities)
+        found_items, all_ingredients = collect_matches(
+            [ingredient for ingredient, _ in ingredient_quantities], match_once
+        )
+        results = build_analysis_result(found_items, all_ingredients, ingredient_quantities, food_map, score_mode)
+        results['name'] = name
+        results['exposure_by_level'] = exposure_by_level(all_ingredients, results['quantities'])
+        recipe_results.append(results)
+
+        for ingredient, info in all_ingredients.items():
+            found_key = matches[ingredient][0]
+            if found_key is None:
+                continue
+            offender = offenders.setdefault(found_key, {
+                'food_item': found_key, 'level': info['level'], 'notes': info['notes'],
+                'exposure': 0.0, 'recipes': [],
+            })
+            offender['exposure'] += ingredient_exposure(info, results['quantities'].get(ingredient))
+            if name not in offender['recipes']:
+                offender['recipes'].append(name)
+    CUMULATIVE_STATS.merge(stats)
+
+    exposure_totals = {level: round(sum(r['exposure_by_level'][level] for r in recipe_results), 2)
+                       for level in LEVELS[1:]}
+    level_counts = {level: sum(1 for offender in offenders.values() if offender['level'] == level)
+                    for level in LEVELS}
+    worst = sorted(
+        (offender for offender in offenders.values() if offender['level']),
+        key=lambda offender: (-offender['level'], -offender['exposure'], -len(offender['recipes']))
+    )[:top_offenders]
+    for offender in worst:
+        offender['exposure'] = round(offender['exposure'], 2)
+
+    count_score = sum(r['count_score'] for r in recipe_results)
+    exposure_score = round(sum(r['exposure_score'] for r in recipe_results), 2)
+    return {
+        'recipes': recipe_results,
+        'total_score': exposure_score if score_mode == 'exposure' else count_score,
+        'count_score': count_score,
+        'exposure_score': exposure_score,
+        'score_mode': score_mode,
+        'exposure_by_level': exposure_totals,
+        'distinct_items_by_level': level_counts,
+        'offenders': worst,
+        'ingredient_lines': total_lines,
+        'distinct_ingredients': len(matches),
+        'match_stats': stats.to_dict(),
+    }
+
+
+def split_meal_plan(text, separator='---'):
+    """Split pasted text into (name, recipe_text) pairs on separator lines.
+
+    A recipe may start with a title line, marked with a leading '#' or 'Title:'; it names the
+    recipe and is left out of recipe_text, so title words ("Corn Chowder") are never matched
+    as ingredients. Without one, the recipe is named after its first line, which is still
+    analyzed like every other line.
+    """
+    recipes = []
+    current = []
+    for line in text.split('\n') + [separator]:
+        if line.strip() == separator:
+            recipe_text = '\n'.join(current).strip()
+            if recipe_text:
+                first_line, _, body = recipe_text.partition('\n')
+                title = TITLE_PATTERN.match(first_line)
+                if title:
+                    first_line, recipe_text = title.group(1).strip() or 'Untitled', body.strip()
+                recipes.append((f"{len(recipes) + 1}. {first_line.strip()[:40]}", recipe_text))
+            current = []
+        else:
+            current.append(line)
+    return recipes
@@ -3,26 +3,136 @@ Recipe Checker - Core Logic
 Analyzes recipes for food allergies and dietary restrictions.
 """
 
+import json
+import os
 import re
+import tempfile
+import threading
+import time
 import openpyxl
 from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from match_stats import CUMULATIVE_STATS, MatchStats
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# Journal size at which add_food_item folds edits back into the workbook
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+_food_map_cache = {}
+_food_map_lock = threading.RLock()
+
+
+def journal_path_for(excel_path):
+    """Return the path of the append-only edit journal belonging to a food map workbook."""
+    return os.path.splitext(excel_path)[0] + '.journal.jsonl'
+
+
+def journal_archive_path_for(excel_path):
+    """Return the path where compacted journal entries are kept as an audit trail."""
+    return os.path.splitext(excel_path)[0] + '.journal.archive.jsonl'
+
+
+@contextmanager
+def _journal_lock(excel_path):
+    """Hold the journal lock across threads and processes (app workers, CLI tools) sharing one food map."""
+    with _food_map_lock:
+        with open(journal_path_for(excel_path) + '.lock', 'a+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass  # LK_LOCK gives up after ten seconds; keep waiting
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 
 def load_food_map(excel_path='Food_Map_Levels.xlsx'):
-    """Load food → risk level mapping from Excel file."""
-    food_map = {}
-    
+    """Load food → risk level mapping: the Excel snapshot with the edit journal replayed over it."""
+    with _food_map_lock:
+        signature = _file_signature(excel_path)
+        cached = _food_map_cache.get(excel_path)
+        if cached is None or cached['signature'] != signature:
+            snapshot = read_food_map_snapshot(excel_path)
+            if not snapshot:
+                _food_map_cache.pop(excel_path, None)
+                return {}
+            cached = {
+                'signature': signature,
+                'food_map': snapshot,
+                'aliases': _clean_aliases(snapshot),
+                'journal_offset': 0,
+            }
+            _food_map_cache[excel_path] = cached
+
+        journal_signature = _file_signature(journal_path_for(excel_path))
+        journal_size = journal_signature[1] if journal_signature else 0
+        if journal_size < cached['journal_offset']:
+            # Journal was compacted or replaced underneath us; rebuild from the snapshot
+            _food_map_cache.pop(excel_path, None)
+            return load_food_map(excel_path)
+
+        if journal_size > cached['journal_offset']:
+            food_map = dict(cached['food_map'])
+            offset = cached['journal_offset']
+            for entry, offset in iter_journal(excel_path, offset):
+                apply_journal_entry(food_map, entry, cached['aliases'])
+            cached['food_map'] = food_map
+            cached['journal_offset'] = offset
+
+        return dict(cached['food_map'])
+
+
+def iter_food_map_rows(excel_path='Food_Map_Levels.xlsx'):
+    """Stream (food item, level, notes) rows from a food map workbook with bounded memory.
+
+    Uses openpyxl's read-only mode, so rows are parsed one at a time instead of
+    materializing every cell of the workbook.
+    """
+    wb = openpyxl.load_workbook(excel_path, read_only=True)
     try:
-        wb = openpyxl.load_workbook(excel_path)
         ws = wb.active
-        
         # Skip header row
-        for row in ws.iter_rows(min_row=2, values_only=True):
+        for row in ws.iter_rows(min_row=2, max_col=3, values_only=True):
+            row = tuple(row) + (None,) * (3 - len(row))
             if row[0] and row[1] is not None:
-                food_item = str(row[0]).strip().lower()
-                level = int(row[1])
-                notes = str(row[2]) if row[2] else ''
-                food_map[food_item] = {'level': level, 'notes': notes}
+                yield str(row[0]).strip(), int(row[1]), str(row[2]) if row[2] else ''
+    finally:
+        wb.close()
+
+
+def read_food_map_snapshot(excel_path='Food_Map_Levels.xlsx'):
+    """Load the last compacted food → risk level mapping straight from the Excel file."""
+    food_map = {}
+    
+    try:
+        for food_item, level, notes in iter_food_map_rows(excel_path):
+            food_map[food_item.lower()] = {'level': level, 'notes': notes}
     
     except FileNotFoundError:
         print(f"Error: Could not find {excel_path}")
@@ -56,8 +166,103 @@ def clean_food_item_name(food_item):
     return food_item_clean
 
 
+def iter_journal(excel_path, offset=0):
+    """Stream journal entries from a byte offset, yielding (entry, end_offset) one line at a time.
+
+    A trailing line that is still being written is left for the next read.
+    """
+    try:
+        f = open(journal_path_for(excel_path), 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                print(f"Skipping malformed journal line: {line[:80]!r}")
+                continue
+            yield entry, offset
+
+
+def read_journal(excel_path, offset=0):
+    """Read journal entries starting at a byte offset. Returns (entries, end_offset)."""
+    entries = []
+    end_offset = offset
+    for entry, end_offset in iter_journal(excel_path, offset):
+        entries.append(entry)
+    return entries, end_offset
+
+
+def _clean_aliases(food_map):
+    """Map cleaned names to the raw keys they came from, for keys that are not already clean."""
+    aliases = {}
+    for key in food_map:
+        cleaned = clean_food_item_name(key).lower()
+        if cleaned != key:
+            aliases.setdefault(cleaned, key)
+    return aliases
+
+
+def _resolve_existing_key(food_map, key, aliases):
+    if key in food_map:
+        return key
+    alias = aliases.get(key) if aliases else None
+    return alias if alias in food_map else None
+
+
+def apply_journal_entry(food_map, entry, aliases=None):
+    """Apply one journal edit to a food map in place, the same way compaction updates the workbook row."""
+    key = str(entry['item']).strip().lower()
+    existing = _resolve_existing_key(food_map, key, aliases)
+
+    if entry.get('new_level') is None:
+        if existing is not None:
+            del food_map[existing]
+        return
+
+    info = {'level': int(entry['new_level']), 'notes': entry.get('notes') or ''}
+    if existing is None or existing == key:
+        food_map[key] = info
+        return
+
+    # The workbook row is renamed in place, so the entry keeps its position in match order
+    items = list(food_map.items())
+    food_map.clear()
+    for item_key, item_info in items:
+        if item_key == existing:
+            food_map[key] = info
+        else:
+            food_map[item_key] = item_info
+
+
+def append_journal_entry(excel_path, entry):
+    """Append one edit to the food map journal."""
+    append_journal_entries(excel_path, [entry])
+
+
+def append_journal_entries(excel_path, entries):
+    """Append a batch of edits to the food map journal with a single write and sync."""
+    data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries)
+    with _journal_lock(excel_path):
+        with open(journal_path_for(excel_path), 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def journal_timestamp():
+    return datetime.now(timezone.utc).isoformat()
+
+
 def add_food_item(excel_path, food_item, level, notes=''):
-    """Add a new food item to the Excel file. Measurements are automatically removed."""
+    """Record a food item edit in the map's journal. Measurements are automatically removed."""
     try:
         food_item_clean = clean_food_item_name(food_item)
         
@@ -65,26 +270,23 @@ def add_food_item(excel_path, food_item, level, notes=''):
             print(f"Error: Food item name is empty after cleaning")
             return False
         
-        food_item_lower = food_item_clean.lower()
-        wb = openpyxl.load_workbook(excel_path)
-        ws = wb.active
-        
-        for row in ws.iter_rows(min_row=2, values_only=False):
-            if row[0].value:
-                existing_item = clean_food_item_name(str(row[0].value))
-                if existing_item.lower() == food_item_lower:
-                    row[0].value = food_item_clean
-                    row[1].value = int(level)
-                    row[2].value = str(notes) if notes else ''
-                    wb.save(excel_path)
-                    return True
+        food_map = load_food_map(excel_path)
+        with _food_map_lock:
+            aliases = _food_map_cache.get(excel_path, {}).get('aliases')
+        existing = _resolve_existing_key(food_map, food_item_clean.lower(), aliases)
+        current = food_map.get(existing) if existing is not None else None
         
-        next_row = ws.max_row + 1
-        ws.cell(row=next_row, column=1, value=food_item_clean)
-        ws.cell(row=next_row, column=2, value=int(level))
-        ws.cell(row=next_row, column=3, value=str(notes) if notes else '')
+        append_journal_entry(excel_path, {
+            'timestamp': journal_timestamp(),
+            'item': food_item_clean,
+            'old_level': current['level'] if current else None,
+            'new_level': int(level),
+            'old_notes': current['notes'] if current else '',
+            'notes': str(notes) if notes else '',
+        })
         
-        wb.save(excel_path)
+        if os.path.getsize(journal_path_for(excel_path)) >= JOURNAL_COMPACT_BYTES:
+            compact_food_map(excel_path)
         return True
         
     except Exception as e:
@@ -92,105 +294,446 @@ def add_food_item(excel_path, food_item, level, notes=''):
         return False
 
 
-def extract_all_ingredients(recipe_text):
-    """Extract all ingredients from recipe text maintaining 1-to-1 mapping."""
+def undo_last_edit(excel_path='Food_Map_Levels.xlsx'):
+    """Revert the most recent journal edit that has not been undone yet. Returns the reverted entry or None."""
+    entries, _ = read_journal(excel_path)
+    pending = []
+    for entry in entries:
+        if 'undo_of' in entry:
+            undone = (entry['undo_of'], str(entry['item']).lower())
+            pending = [e for e in pending if (e['timestamp'], str(e['item']).lower()) != undone]
+        else:
+            pending.append(entry)
+    if not pending:
+        return None
+
+    last = pending[-1]
+    append_journal_entry(excel_path, {
+        'timestamp': journal_timestamp(),
+        'item': last['item'],
+        'old_level': last.get('new_level'),
+        'new_level': last.get('old_level'),
+        'old_notes': last.get('notes', ''),
+        'notes': last.get('old_notes', ''),
+        'undo_of': last['timestamp'],
+    })
+    return last
+
+
+def write_food_map_workbook(excel_path, food_map, display_names=None, header=('Food Item', 'Level', 'Notes'),
+                            title='Food Map'):
+    """Write a food map to a workbook in openpyxl's streaming write-only mode, in match order."""
+    display_names = display_names or {}
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(list(header))
+    for food_item, info in food_map.items():
+        ws.append([display_names.get(food_item, food_item), info['level'], info['notes']])
+    wb.save(excel_path)
+
+
+def _read_workbook_layout(excel_path):
+    """Return (header, sheet title) of a food map workbook without loading its rows."""
+    wb = openpyxl.load_workbook(excel_path, read_only=True)
+    try:
+        ws = wb.active
+        header = next(ws.iter_rows(max_row=1, max_col=3, values_only=True), None)
+        return tuple(header) if header else ('Food Item', 'Level', 'Notes'), ws.title
+    finally:
+        wb.close()
+
+
+def compact_food_map(excel_path='Food_Map_Levels.xlsx'):
+    """Fold the edit journal into the Excel file and start a fresh journal. Returns True on success.
+
+    The snapshot is streamed in and the new workbook streamed out, so compaction after a
+    bulk import does not hold the whole workbook's cell objects in memory. The journal lock
+    is held throughout, so edits appended by other processes are never lost.
+    """
+    journal_path = journal_path_for(excel_path)
+    with _journal_lock(excel_path):
+        journal_signature = _file_signature(journal_path)
+        if not journal_signature or not journal_signature[1]:
+            return True
+        
+        try:
+            food_map = {}
+            display_names = {}
+            for food_item, level, notes in iter_food_map_rows(excel_path):
+                key = food_item.lower()
+                food_map[key] = {'level': level, 'notes': notes}
+                display_names[key] = food_item
+            aliases = _clean_aliases(food_map)
+            
+            offset = 0
+            for entry, offset in iter_journal(excel_path):
+                apply_journal_entry(food_map, entry, aliases)
+                if entry.get('new_level') is not None:
+                    display_names[str(entry['item']).strip().lower()] = str(entry['item']).strip()
+            
+            header, title = _read_workbook_layout(excel_path)
+            
+            # Write next to the original and swap, so a failed save never leaves a half-written workbook
+            fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(os.path.abspath(excel_path)))
+            os.close(fd)
+            try:
+                write_food_map_workbook(tmp_path, food_map, display_names, header, title)
+                os.replace(tmp_path, excel_path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+            
+            with open(journal_path, 'rb') as f:
+                with open(journal_archive_path_for(excel_path), 'ab') as archive:
+                    remaining = offset
+                    while remaining:
+                        chunk = f.read(min(remaining, 1024 * 1024))
+                        if not chunk:
+                            break
+                        archive.write(chunk)
+                        remaining -= len(chunk)
+                remainder = f.read()
+            with open(journal_path, 'wb') as f:
+                f.write(remainder)
+            _food_map_cache.pop(excel_path, None)
+            return True
+        
+        except Exception as e:
+            print(f"Error compacting food map: {e}")
+            return False
+
+
+# Unicode vulgar fractions as they appear in pasted recipes
+UNICODE_FRACTIONS = {
+    '½': 1 / 2, '⅓': 1 / 3, '⅔': 2 / 3, '¼': 1 / 4, '¾': 3 / 4, '⅕': 1 / 5, '⅖': 2 / 5,
+    '⅗': 3 / 5, '⅘': 4 / 5, '⅙': 1 / 6, '⅚': 5 / 6, '⅛': 1 / 8, '⅜': 3 / 8, '⅝': 5 / 8, '⅞': 7 / 8,
+}
+
+# Unit spelling → (canonical unit, approximate grams per unit; volumes assume water density)
+UNIT_GRAMS = {
+    'cup': ('cup', 240.0), 'cups': ('cup', 240.0),
+    'tablespoon': ('tbsp', 15.0), 'tablespoons': ('tbsp', 15.0), 'tbsp': ('tbsp', 15.0),
+    'tbsps': ('tbsp', 15.0), 'tbs': ('tbsp', 15.0),
+    'teaspoon': ('tsp', 5.0), 'teaspoons': ('tsp', 5.0), 'tsp': ('tsp', 5.0), 'tsps': ('tsp', 5.0),
+    'pound': ('lb', 453.6), 'pounds': ('lb', 453.6), 'lb': ('lb', 453.6), 'lbs': ('lb', 453.6),
+    'ounce': ('oz', 28.35), 'ounces': ('oz', 28.35), 'oz': ('oz', 28.35),
+    'kilogram': ('kg', 1000.0), 'kilograms': ('kg', 1000.0), 'kg': ('kg', 1000.0),
+    'gram': ('g', 1.0), 'grams': ('g', 1.0), 'g': ('g', 1.0),
+    'milliliter': ('ml', 1.0), 'milliliters': ('ml', 1.0), 'millilitre': ('ml', 1.0),
+    'millilitres': ('ml', 1.0), 'ml': ('ml', 1.0),
+    'liter': ('l', 1000.0), 'liters': ('l', 1000.0), 'litre': ('l', 1000.0), 'litres': ('l', 1000.0),
+    'l': ('l', 1000.0),
+    'quart': ('quart', 946.0), 'quarts': ('quart', 946.0), 'qt': ('quart', 946.0),
+    'pint': ('pint', 473.0), 'pints': ('pint', 473.0), 'pt': ('pint', 473.0),
+    'gallon': ('gallon', 3785.0), 'gallons': ('gallon', 3785.0),
+    'clove': ('clove', 5.0), 'cloves': ('clove', 5.0),
+    'pinch': ('pinch', 0.35), 'pinches': ('pinch', 0.35),
+    'dash': ('dash', 0.6), 'dashes': ('dash', 0.6),
+    'slice': ('slice', 25.0), 'slices': ('slice', 25.0),
+    'piece': ('piece', 50.0), 'pieces': ('piece', 50.0),
+    'stick': ('stick', 113.0), 'sticks': ('stick', 113.0),
+    'can': ('can', 400.0), 'cans': ('can', 400.0),
+    'bunch': ('bunch', 100.0), 'bunches': ('bunch', 100.0),
+}
+# Grams assumed for a bare count such as "2 eggs"
+COUNT_UNIT_GRAMS = 50.0
+# Grams that weigh the same as one unquantified ingredient in the exposure score
+EXPOSURE_REFERENCE_GRAMS = 100.0
+
+_NUMBER = r'(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?\s*[{fractions}]?|[{fractions}])'.format(
+    fractions=''.join(UNICODE_FRACTIONS)
+)
+QUANTITY_PATTERN = re.compile(
+    r'^\s*(?:[▢▣☐☑☒✓✗]\s*)?'
+    r'(?P<amount>' + _NUMBER + r')'
+    r'(?:\s*(?:-|–|to)\s*(?P<upper>' + _NUMBER + r'))?'
+    r'(?:\s*(?P<unit>' + '|'.join(sorted(UNIT_GRAMS, key=len, reverse=True)) + r')\b\.?)?',
+    re.IGNORECASE
+)
+
+
+def _parse_number(text):
+    text = text.strip()
+    total = 0.0
+    for part in text.split():
+        if '/' in part:
+            numerator, denominator = part.split('/', 1)
+            total += float(numerator) / float(denominator) if float(denominator) else 0.0
+            continue
+        if part[-1] in UNICODE_FRACTIONS:
+            total += UNICODE_FRACTIONS[part[-1]]
+            part = part[:-1]
+        if part:
+            total += float(part)
+    return total
+
+
+def parse_quantity(text):
+    """Parse a leading quantity and unit such as '1 1/2 cups', '1-2 tbsp' or '½ lb'.
+
+    Returns {'amount', 'amount_max', 'unit', 'grams'} with grams normalized to a common
+    scale (ranges use their midpoint), or None when the text has no leading quantity.
+    """
+    match = QUANTITY_PATTERN.match(text)
+    if not match:
+        return None
+
+    amount = _parse_number(match.group('amount'))
+    amount_max = _parse_number(match.group('upper')) if match.group('upper') else amount
+    unit_text = match.group('unit')
+    if unit_text:
+        unit, grams_per_unit = UNIT_GRAMS[unit_text.lower()]
+    else:
+        unit, grams_per_unit = 'each', COUNT_UNIT_GRAMS
+
+    return {
+        'amount': amount,
+        'amount_max': amount_max,
+        'unit': unit,
+        'grams': (amount + amount_max) / 2 * grams_per_unit,
+    }
+
+
+def extract_all_ingredients(recipe_text, with_quantities=False):
+    """Extract all ingredients from recipe text maintaining 1-to-1 mapping.
+
+    With with_quantities=True, returns (ingredient, quantity) pairs where quantity is the
+    parse_quantity result for the ingredient's original text (or None).
+    """
     lines = recipe_text.split('\n')
-    non_empty_lines = [line.strip() for line in lines if line.strip()]
-    use_line_breaks = len(non_empty_lines) > 1
+    use_line_breaks = uses_line_breaks(lines)
     
     all_ingredients = []
     
     for line in lines:
-        line = line.strip()
-        if not line:
+        all_ingredients.extend(extract_line_ingredients(line, use_line_breaks, with_quantities))
+    
+    return all_ingredients
+
+
+def uses_line_breaks(lines):
+    """Return True when a recipe has one ingredient per line rather than a single comma-separated line."""
+    non_empty = 0
+    for line in lines:
+        if line.strip():
+            non_empty += 1
+            if non_empty > 1:
+                return True
+    return False
+
+
+def extract_line_ingredients(line, use_line_breaks, with_quantities=False):
+    """Extract the ingredients on a single recipe line.
+
+    Extraction is line-local: the only thing it needs from the rest of the recipe is
+    use_line_breaks, so results can be memoized per (line, use_line_breaks).
+    """
+    ingredients = []
+    
+    line = line.strip()
+    if not line:
+        return []
+    
+    if line.isupper() and len(line) < 50:
+        return []
+    
+    if ':' in line:
+        parts = line.split(':', 1)
+        if len(parts) == 2:
+            header = parts[0].strip().lower()
+            skip_headers = {'ingredient', 'ingredients', 'recipe', 'instructions', 'directions', 'method', 'steps'}
+            if header in skip_headers or any(header.startswith(word) for word in skip_headers):
+                line = parts[1].strip()
+                if not line:
+                    return []
+    
+    if use_line_breaks:
+        all_items = [line]
+    else:
+        all_items = [item.strip() for item in line.split(',')]
+    
+    processed_items = []
+    for item in all_items:
+        item = item.strip()
+        if not item:
             continue
         
-        if line.isupper() and len(line) < 50:
+        item = re.sub(r'^(or|Or)\s+', '', item, flags=re.IGNORECASE).strip()
+        if not item:
             continue
         
-        if ':' in line:
-            parts = line.split(':', 1)
-            if len(parts) == 2:
-                header = parts[0].strip().lower()
-                skip_headers = {'ingredient', 'ingredients', 'recipe', 'instructions', 'directions', 'method', 'steps'}
-                if header in skip_headers or any(header.startswith(word) for word in skip_headers):
-                    line = parts[1].strip()
-                    if not line:
-                        continue
+        paren_pattern = r'\([^)]*\)'
+        paren_matches = re.findall(paren_pattern, item)
         
-        if use_line_breaks:
-            all_items = [line]
-        else:
-            all_items = [item.strip() for item in line.split(',')]
-        
-        processed_items = []
-        for item in all_items:
-            item = item.strip()
-            if not item:
-                continue
+        if paren_matches:
+            placeholders = []
+            temp_item = item
+            for i, match in enumerate(paren_matches):
+                placeholder = f"__PAREN_{i}__"
+                placeholders.append(match)
+                temp_item = temp_item.replace(match, placeholder, 1)
             
-            item = re.sub(r'^(or|Or)\s+', '', item, flags=re.IGNORECASE).strip()
-            if not item:
-                continue
-            
-            paren_pattern = r'\([^)]*\)'
-            paren_matches = re.findall(paren_pattern, item)
+            or_separated = re.split(r'\s+or\s+', temp_item, flags=re.IGNORECASE)
             
-            if paren_matches:
-                placeholders = []
-                temp_item = item
-                for i, match in enumerate(paren_matches):
-                    placeholder = f"__PAREN_{i}__"
-                    placeholders.append(match)
-                    temp_item = temp_item.replace(match, placeholder, 1)
-                
-                or_separated = re.split(r'\s+or\s+', temp_item, flags=re.IGNORECASE)
-                
-                for subitem in or_separated:
-                    restored = subitem.strip()
-                    for i, placeholder in enumerate([f"__PAREN_{j}__" for j in range(len(placeholders))]):
-                        if placeholder in restored:
-                            restored = restored.replace(placeholder, placeholders[i])
-                    if restored:
-                        processed_items.append(restored)
-            else:
-                or_separated = re.split(r'\s+or\s+', item, flags=re.IGNORECASE)
-                processed_items.extend([subitem.strip() for subitem in or_separated if subitem.strip()])
+            for subitem in or_separated:
+                restored = subitem.strip()
+                for i, placeholder in enumerate([f"__PAREN_{j}__" for j in range(len(placeholders))]):
+                    if placeholder in restored:
+                        restored = restored.replace(placeholder, placeholders[i])
+                if restored:
+                    processed_items.append(restored)
+        else:
+            or_separated = re.split(r'\s+or\s+', item, flags=re.IGNORECASE)
+            processed_items.extend([subitem.strip() for subitem in or_separated if subitem.strip()])
+    
+    for ingredient_raw in processed_items:
+        ingredient_raw = ingredient_raw.strip()
+        if not ingredient_raw:
+            continue
         
-        for ingredient_raw in processed_items:
-            ingredient_raw = ingredient_raw.strip()
-            if not ingredient_raw:
-                continue
-            
-            ingredient_clean = re.sub(
-                r'^\d+\s*(?:cups?|tbsp|tablespoons?|tsp|teaspoons?|lb|lbs|pound|pounds|oz|ounce|ounces|gram|grams|kg|kilogram|kilograms|ml|milliliter|milliliters|l|liter|liters|clove|cloves|piece|pieces|slice|slices|can|cans|bunch|bunches|pinch|pinches|dash|dashes)\s+',
-                '',
-                ingredient_raw,
-                flags=re.IGNORECASE
-            )
-            ingredient_clean = re.sub(r'\s+(?:to\s+)?taste.*$', '', ingredient_clean, flags=re.IGNORECASE)
-            ingredient_clean = re.sub(r'\s+as\s+needed.*$', '', ingredient_clean, flags=re.IGNORECASE)
-            ingredient_clean = re.sub(r'\s+\(.*?\)\s*$', '', ingredient_clean)
-            ingredient_clean = ' '.join(ingredient_clean.split()).strip()
-            ingredient_clean = re.sub(r'[:;.,!?]+$', '', ingredient_clean).strip()
+        ingredient_clean = re.sub(
+            r'^\d+\s*(?:cups?|tbsp|tablespoons?|tsp|teaspoons?|lb|lbs|pound|pounds|oz|ounce|ounces|gram|grams|kg|kilogram|kilograms|ml|milliliter|milliliters|l|liter|liters|clove|cloves|piece|pieces|slice|slices|can|cans|bunch|bunches|pinch|pinches|dash|dashes)\s+',
+            '',
+            ingredient_raw,
+            flags=re.IGNORECASE
+        )
+        ingredient_clean = re.sub(r'\s+(?:to\s+)?taste.*$', '', ingredient_clean, flags=re.IGNORECASE)
+        ingredient_clean = re.sub(r'\s+as\s+needed.*$', '', ingredient_clean, flags=re.IGNORECASE)
+        ingredient_clean = re.sub(r'\s+\(.*?\)\s*$', '', ingredient_clean)
+        ingredient_clean = ' '.join(ingredient_clean.split()).strip()
+        ingredient_clean = re.sub(r'[:;.,!?]+$', '', ingredient_clean).strip()
+        
+        if ingredient_clean and len(ingredient_clean) > 1:
+            ingredient_lower = ingredient_clean.lower()
+            skip_words = {'ingredient', 'ingredients', 'recipe', 'instructions', 'directions', 'method', 'steps', 'save', 'print','bookmark','bookmarks','printprint','see all nutritional information'}
             
-            if ingredient_clean and len(ingredient_clean) > 1:
-                ingredient_lower = ingredient_clean.lower()
-                skip_words = {'ingredient', 'ingredients', 'recipe', 'instructions', 'directions', 'method', 'steps', 'save', 'print','bookmark','bookmarks','printprint','see all nutritional information'}
-                
-                if ingredient_lower not in skip_words and not any(ingredient_lower.startswith(word + ' ') for word in skip_words):
-                    all_ingredients.append(ingredient_lower)
+            if ingredient_lower not in skip_words and not any(ingredient_lower.startswith(word + ' ') for word in skip_words):
+                if with_quantities:
+                    ingredients.append((ingredient_lower, parse_quantity(ingredient_raw)))
+                else:
+                    ingredients.append(ingredient_lower)
     
-    return all_ingredients
+    return ingredients
 
 
-def parse_recipe(recipe_text, food_map):
-    """Parse recipe text and match ingredients against food map."""
-    recipe_lower = recipe_text.lower()
-    found_items = defaultdict(lambda: {'level': 0, 'notes': '', 'count': 0, 'matched': True})
-    all_ingredients_dict = defaultdict(lambda: {'matched': False, 'level': None, 'notes': '', 'count': 0})
+CORE_MEASUREMENT_PATTERN = re.compile(
+    r'^\d+\s*(?:cups?|tbsp|tablespoons?|tsp|teaspoons?|lb|lbs|pound|pounds|oz|ounce|ounces|gram|grams|kg|kilogram|kilograms|ml|milliliter|milliliters|l|liter|liters|clove|cloves|piece|pieces|slice|slices|can|cans|bunch|bunches|pinch|pinches|dash|dashes)\s+',
+    re.IGNORECASE
+)
+
+
+def extract_core_ingredient(text):
+    """Extract core ingredient name by removing measurements."""
+    text_lower = text.lower()
+    text_lower = CORE_MEASUREMENT_PATTERN.sub('', text_lower, count=1)
+    return text_lower.strip()
+
+
+def build_match_index(food_map):
+    """Precompute the per-entry work of match_ingredient's map scan.
+
+    Returns one (position, food_item_lower, info, core, word_pattern, core_pattern) tuple
+    per entry in dict order, so the first matching entry still wins. Entries containing
+    'corn' are left out because the scan always skips them.
+    """
+    index = []
+    for position, (food_item, info) in enumerate(food_map.items(), 1):
+        food_item_lower = food_item.lower()
+        if 'corn' in food_item_lower:
+            continue
+        food_item_core = extract_core_ingredient(food_item)
+        index.append((
+            position,
+            food_item_lower,
+            info,
+            food_item_core,
+            re.compile(r'\b' + re.escape(food_item_lower) + r'\b', re.IGNORECASE),
+            re.compile(r'\b' + re.escape(food_item_core) + r'\b', re.IGNORECASE) if food_item_core else None,
+        ))
+    return index
+
+
+def match_ingredient(ingredient, food_map, stats=None, index=None):
+    """Match one extracted ingredient against the food map.
+
+    Returns (found_key, result): result is the ingredient's all_ingredients entry and
+    found_key the found_items key it contributes (None when unmatched). The tiers run
+    in order: corn rule, exact dict hit, then a scan over the map in dict order where
+    the first entry that matches by word boundary or core name wins. Without an index
+    one is built for this call, so callers matching many ingredients against one map
+    must build it once with build_match_index and pass it as index.
+    """
+    started = time.perf_counter() if stats is not None else 0.0
+    ingredient_lower = ingredient.lower()
+    ingredient_core = extract_core_ingredient(ingredient)
+    
+    if 'corn' in ingredient_lower:
+        if stats is not None:
+            stats.record(ingredient, 'corn', 0, time.perf_counter() - started)
+        return ingredient, {
+            'matched': True,
+            'level': 3,
+            'notes': 'Critical - contains corn',
+            'count': 1
+        }
+    
+    if ingredient_lower in food_map:
+        info = food_map[ingredient_lower]
+        if stats is not None:
+            stats.record(ingredient, 'exact', 0, time.perf_counter() - started, ingredient_lower)
+        return ingredient_lower, {
+            'matched': True,
+            'level': info['level'],
+            'notes': info['notes'],
+            'count': 1
+        }
+    
+    if index is None:
+        index = build_match_index(food_map)
     
-    all_ingredients = extract_all_ingredients(recipe_text)
+    matched = False
+    scanned = len(food_map)
+    for position, food_item_lower, info, food_item_core, word_pattern, core_pattern in index:
+        if word_pattern.search(ingredient_lower):
+            matched = 'word_boundary'
+            break
+        
+        if ingredient_core and food_item_core:
+            if ingredient_core == food_item_core:
+                matched = 'core_equal'
+                break
+            elif ingredient_core in food_item_core or food_item_core in ingredient_core:
+                if len(ingredient_core) < len(food_item_core):
+                    found = re.search(r'\b' + re.escape(ingredient_core) + r'\b', food_item_core, re.IGNORECASE)
+                else:
+                    found = core_pattern.search(ingredient_core)
+                if found:
+                    matched = 'core_contains'
+                    break
+    if matched:
+        scanned = position
+    
+    if stats is not None:
+        stats.record(ingredient, matched or 'unknown', scanned, time.perf_counter() - started,
+                     food_item_lower if matched else None)
+    if not matched:
+        return None, {'matched': False, 'level': None, 'notes': '', 'count': 1}
+    return food_item_lower, {
+        'matched': True,
+        'level': info['level'],
+        'notes': info['notes'],
+        'count': 1
+    }
+
+
+def collect_matches(all_ingredients, match):
+    """Build parse_recipe's (found_items, all_ingredients) from a per-ingredient match function.
+
+    match(ingredient) returns match_ingredient's (found_key, result). A found_items key is
+    recorded the first time any ingredient resolves to it.
+    """
+    found_items = {}
+    all_ingredients_dict = {}
     
     for ingredient in all_ingredients:
         all_ingredients_dict[ingredient] = {
@@ -200,116 +743,33 @@ def parse_recipe(recipe_text, food_map):
             'count': 1
         }
     
-    def extract_core_ingredient(text):
-        """Extract core ingredient name by removing measurements."""
-        text_lower = text.lower()
-        text_lower = re.sub(
-            r'^\d+\s*(?:cups?|tbsp|tablespoons?|tsp|teaspoons?|lb|lbs|pound|pounds|oz|ounce|ounces|gram|grams|kg|kilogram|kilograms|ml|milliliter|milliliters|l|liter|liters|clove|cloves|piece|pieces|slice|slices|can|cans|bunch|bunches|pinch|pinches|dash|dashes)\s+',
-            '',
-            text_lower,
-            flags=re.IGNORECASE
-        )
-        return text_lower.strip()
-    
     for ingredient in all_ingredients:
-        ingredient_lower = ingredient.lower()
-        ingredient_core = extract_core_ingredient(ingredient)
-        
-        if 'corn' in ingredient_lower:
-            all_ingredients_dict[ingredient] = {
-                'matched': True,
-                'level': 3,
-                'notes': 'Critical - contains corn',
-                'count': 1
-            }
-            found_items[ingredient] = {
-                'level': 3,
-                'notes': 'Critical - contains corn',
-                'count': 1,
-                'matched': True
-            }
-            continue
-        
-        if ingredient_lower in food_map:
-            info = food_map[ingredient_lower]
-            all_ingredients_dict[ingredient] = {
-                'matched': True,
-                'level': info['level'],
-                'notes': info['notes'],
-                'count': 1
-            }
-            found_items[ingredient_lower] = {
-                'level': info['level'],
-                'notes': info['notes'],
+        found_key, result = match(ingredient)
+        all_ingredients_dict[ingredient] = result
+        if found_key is not None and found_key not in found_items:
+            found_items[found_key] = {
+                'level': result['level'],
+                'notes': result['notes'],
                 'count': 1,
                 'matched': True
             }
-            continue
-        
-        matched = False
-        for food_item, info in food_map.items():
-            food_item_lower = food_item.lower()
-            food_item_core = extract_core_ingredient(food_item)
-            
-            if 'corn' in food_item_lower:
-                continue
-            
-            pattern = r'\b' + re.escape(food_item_lower) + r'\b'
-            if re.search(pattern, ingredient_lower, re.IGNORECASE):
-                all_ingredients_dict[ingredient] = {
-                    'matched': True,
-                    'level': info['level'],
-                    'notes': info['notes'],
-                    'count': 1
-                }
-                if food_item_lower not in found_items:
-                    found_items[food_item_lower] = {
-                        'level': info['level'],
-                        'notes': info['notes'],
-                        'count': 1,
-                        'matched': True
-                    }
-                matched = True
-                break
-            
-            if ingredient_core and food_item_core:
-                if ingredient_core == food_item_core:
-                    all_ingredients_dict[ingredient] = {
-                        'matched': True,
-                        'level': info['level'],
-                        'notes': info['notes'],
-                        'count': 1
-                    }
-                    if food_item_lower not in found_items:
-                        found_items[food_item_lower] = {
-                            'level': info['level'],
-                            'notes': info['notes'],
-                            'count': 1,
-                            'matched': True
-                        }
-                    matched = True
-                    break
-                elif ingredient_core in food_item_core or food_item_core in ingredient_core:
-                    shorter = ingredient_core if len(ingredient_core) < len(food_item_core) else food_item_core
-                    longer = food_item_core if len(ingredient_core) < len(food_item_core) else ingredient_core
-                    if re.search(r'\b' + re.escape(shorter) + r'\b', longer, re.IGNORECASE):
-                        all_ingredients_dict[ingredient] = {
-                            'matched': True,
-                            'level': info['level'],
-                            'notes': info['notes'],
-                            'count': 1
-                        }
-                        if food_item_lower not in found_items:
-                            found_items[food_item_lower] = {
-                                'level': info['level'],
-                                'notes': info['notes'],
-                                'count': 1,
-                                'matched': True
-                            }
-                        matched = True
-                        break
     
-    return dict(found_items), dict(all_ingredients_dict)
+    return found_items, all_ingredients_dict
+
+
+def parse_recipe(recipe_text, food_map, all_ingredients=None, stats=None, index=None):
+    """Parse recipe text and match ingredients against food map.
+
+    Pass all_ingredients to reuse an extract_all_ingredients result instead of extracting again,
+    a MatchStats as stats to record which matching tier resolved each ingredient, and a
+    prebuilt build_match_index result as index to skip building one for this call.
+    """
+    if all_ingredients is None:
+        all_ingredients = extract_all_ingredients(recipe_text)
+    if index is None:
+        index = build_match_index(food_map)
+    
+    return collect_matches(all_ingredients, lambda ingredient: match_ingredient(ingredient, food_map, stats, index))
 
 
 def categorize_foods(found_items):
@@ -331,27 +791,160 @@ def calculate_total_risk_score(found_items):
     return total_score
 
 
-def analyze_recipe(recipe_text, excel_path='Food_Map_Levels.xlsx'):
-    """Main analysis function."""
-    food_map = load_food_map(excel_path)
-    
+def collect_quantities(ingredient_quantities):
+    """Group (ingredient, quantity) pairs into ingredient → list of parsed quantities."""
+    quantities = defaultdict(list)
+    for ingredient, quantity in ingredient_quantities:
+        if quantity is not None:
+            quantities[ingredient].append(quantity)
+    return dict(quantities)
+
+
+def ingredient_exposure(info, amounts):
+    """Exposure one ingredient contributes: level × (grams / EXPOSURE_REFERENCE_GRAMS).
+
+    Ingredients without a parsed quantity weigh 1, like the count-based score; unmatched
+    and level-0 ingredients contribute nothing.
+    """
+    if not info.get('matched') or not info.get('level'):
+        return 0.0
+    weight = sum(q['grams'] for q in amounts) / EXPOSURE_REFERENCE_GRAMS if amounts else 1.0
+    return info['level'] * weight
+
+
+def calculate_exposure_score(all_ingredients, quantities):
+    """Calculate a quantity-weighted risk score by summing ingredient_exposure over a recipe."""
+    total_score = 0.0
+    for ingredient, info in all_ingredients.items():
+        total_score += ingredient_exposure(info, quantities.get(ingredient))
+    return round(total_score, 2)
+
+
+SCREEN_VERDICTS = ('safe', 'has-avoid', 'has-never', 'over-threshold')
+
+
+def screen_recipe(recipe_text, excel_path='Food_Map_Levels.xlsx', max_score=None, food_map=None, index=None):
+    """Quick safety verdict for bulk screening, without building analyze_recipe's result structure.
+
+    Ingredients are extracted and matched line by line, and screening stops at the first level-3
+    hit ('has-never') or once the running count score exceeds max_score ('over-threshold').
+    Otherwise the verdict is 'has-avoid' if any level-2 item was found, else 'safe'. Returns
+    {'verdict', 'score', 'trigger', 'lines_read', 'complete'}; score is the count-based score of
+    the part read, and equals analyze_recipe's count_score when complete is True.
+    """
+    if food_map is None:
+        food_map = load_food_map(excel_path)
     if not food_map:
-        return {
-            'error': 'Could not load food map',
-            'categorized': {},
-            'total_score': 0,
-            'all_ingredients': {}
-        }
+        return {'error': 'Could not load food map', 'verdict': None}
+    if index is None:
+        index = build_match_index(food_map)
+    
+    lines = recipe_text.split('\n')
+    use_line_breaks = uses_line_breaks(lines)
+    seen_ingredients = set()
+    found_keys = set()
+    score = 0
+    worst = 0
     
-    found_items, all_ingredients = parse_recipe(recipe_text, food_map)
+    for line_number, line in enumerate(lines, 1):
+        for ingredient in extract_line_ingredients(line, use_line_breaks):
+            if ingredient in seen_ingredients:
+                continue
+            seen_ingredients.add(ingredient)
+            found_key, result = match_ingredient(ingredient, food_map, index=index)
+            if found_key is None or found_key in found_keys:
+                continue
+            found_keys.add(found_key)
+            level = result['level']
+            score += level
+            worst = max(worst, level)
+            
+            verdict = None
+            if level == 3:
+                verdict = 'has-never'
+            elif max_score is not None and score > max_score:
+                verdict = 'over-threshold'
+            if verdict:
+                return {
+                    'verdict': verdict,
+                    'score': score,
+                    'trigger': {'ingredient': ingredient, 'food_item': found_key, 'level': level, 'line': line_number},
+                    'lines_read': line_number,
+                    'complete': False,
+                }
+    
+    return {
+        'verdict': 'has-avoid' if worst == 2 else 'safe',
+        'score': score,
+        'trigger': None,
+        'lines_read': len(lines),
+        'complete': True,
+    }
+
+
+def screen_recipes(recipe_texts, excel_path='Food_Map_Levels.xlsx', max_score=None, food_map=None, index=None):
+    """Screen many recipes against one food map and match index. Returns one screen_recipe result per text."""
+    if food_map is None:
+        food_map = load_food_map(excel_path)
+    if not food_map:
+        return [{'error': 'Could not load food map', 'verdict': None} for _ in recipe_texts]
+    if index is None:
+        index = build_match_index(food_map)
+    return [screen_recipe(text, excel_path, max_score, food_map, index) for text in recipe_texts]
+
+
+def food_map_version(excel_path='Food_Map_Levels.xlsx'):
+    """Cheap identifier that changes whenever the workbook or its journal changes."""
+    return (_file_signature(excel_path), _file_signature(journal_path_for(excel_path)))
+
+
+def build_analysis_result(found_items, all_ingredients, ingredient_quantities, food_map, score_mode='count',
+                          stats=None):
+    """Assemble analyze_recipe's result dict from match results and (ingredient, quantity) pairs."""
     categorized = categorize_foods(found_items)
-    total_score = calculate_total_risk_score(found_items)
+    count_score = calculate_total_risk_score(found_items)
+    quantities = collect_quantities(ingredient_quantities)
+    exposure_score = calculate_exposure_score(all_ingredients, quantities)
     
     return {
         'found_items': found_items,
         'categorized': categorized,
-        'total_score': total_score,
+        'total_score': exposure_score if score_mode == 'exposure' else count_score,
+        'count_score': count_score,
+        'exposure_score': exposure_score,
+        'score_mode': score_mode,
+        'quantities': quantities,
+        'match_stats': stats.to_dict() if stats is not None else None,
         'food_map': food_map,
         'all_ingredients': all_ingredients
     }
 
+
+def analyze_recipe(recipe_text, excel_path='Food_Map_Levels.xlsx', score_mode='count', food_map=None, index=None):
+    """Main analysis function.
+
+    score_mode='exposure' reports the quantity-weighted score as total_score; the
+    count-based score is always available as count_score. Match tier statistics for
+    the call are returned as match_stats and added to CUMULATIVE_STATS. Pass food_map
+    and index (e.g. from a FoodMapStore snapshot) to skip loading the map.
+    """
+    if food_map is None:
+        food_map = load_food_map(excel_path)
+    
+    if not food_map:
+        return {
+            'error': 'Could not load food map',
+            'categorized': {},
+            'total_score': 0,
+            'all_ingredients': {}
+        }
+    
+    ingredient_quantities = extract_all_ingredients(recipe_text, with_quantities=True)
+    stats = MatchStats()
+    found_items, all_ingredients = parse_recipe(
+        recipe_text, food_map, all_ingredients=[ingredient for ingredient, _ in ingredient_quantities], stats=stats,
+        index=index
+    )
+    CUMULATIVE_STATS.merge(stats)
+    
+    return build_analysis_result(found_items, all_ingredients, ingredient_quantities, food_map, score_mode, stats)
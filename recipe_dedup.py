@@ -0,0 +1,264 @@
+"""
+Recipe Dedup - Near-Duplicate Grouping for Bulk Screening
+Fingerprints each recipe's normalized ingredient set with MinHash and groups
+near-identical copies through LSH banding for the report. Recipes that extract
+to exactly the same ingredients and quantities share one result; every other
+recipe is scored from its own ingredients, with each distinct ingredient
+matched against the food map only once per batch.
+
+Usage:
+    python recipe_dedup.py saved_pages/
+    python recipe_dedup.py saved_pages/ more_pages/ --threshold 0.8 --save
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import time
+
+from match_stats import CUMULATIVE_STATS, MatchStats
+from recipe_checker_simple import (
+    UNICODE_FRACTIONS,
+    UNIT_GRAMS,
+    build_analysis_result,
+    build_match_index,
+    collect_matches,
+    extract_all_ingredients,
+    load_food_map,
+    match_ingredient,
+)
+from recipe_importer import import_recipe_file, looks_like_html, recipe_text_from_html
+from recipe_library import DEFAULT_LIBRARY_PATH, save_recipe
+
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+DEFAULT_THRESHOLD = 0.85
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+
+_FRACTION_CHARS = ''.join(UNICODE_FRACTIONS)
+_PARENTHETICAL_PATTERN = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+_QUANTITY_TOKEN_PATTERN = re.compile(r'[\d' + _FRACTION_CHARS + r'][\d' + _FRACTION_CHARS + r'/.,\-–]*')
+_NOISE_WORDS = set(UNIT_GRAMS) | {'to', 'taste', 'optional', 'of', 'a', 'an', 'about', 'plus', 'more', 'for',
+                                  'serving', 'servings', 'large', 'small', 'medium'}
+
+
+def normalize_ingredient_line(line):
+    """Reduce an ingredient line to its words, without quantities, units, comments or punctuation."""
+    line = _PARENTHETICAL_PATTERN.sub(' ', line.lower())
+    line = _QUANTITY_TOKEN_PATTERN.sub(' ', line)
+    words = [word for word in re.findall(r'[a-z]+', line) if word not in _NOISE_WORDS]
+    return ' '.join(words)
+
+
+def ingredient_set(recipe_text, ingredients=None):
+    """Return the normalized ingredient set used for fingerprinting.
+
+    Pass structured ingredient lines (e.g. from an imported page) as ingredients to use them
+    instead of splitting the text on lines and commas.
+    """
+    if ingredients is None:
+        ingredients = re.split(r'[\n,]', recipe_text)
+    normalized = set()
+    for line in ingredients:
+        words = normalize_ingredient_line(line)
+        if words:
+            normalized.add(words)
+    return normalized
+
+
+def minhash_signature(items):
+    """Return the MinHash signature of a set of strings (NUM_PERMUTATIONS 32-bit values)."""
+    if not items:
+        return (_MAX_HASH,) * NUM_PERMUTATIONS
+    hashes = [int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+              for item in items]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimate_similarity(signature, other):
+    """Estimate the Jaccard similarity of two sets from their MinHash signatures."""
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+def group_near_duplicates(signatures, threshold=DEFAULT_THRESHOLD, bands=BANDS):
+    """Group signatures whose estimated similarity to the group's first member reaches threshold.
+
+    LSH banding limits the comparisons to recipes sharing at least one band. Returns a list of
+    groups in input order; each group is a list of (position, similarity to the first member).
+    """
+    rows = NUM_PERMUTATIONS // bands
+    buckets = {}
+    groups = {}
+    for position, signature in enumerate(signatures):
+        candidates = []
+        band_keys = [(band, signature[band * rows:(band + 1) * rows]) for band in range(bands)]
+        for key in band_keys:
+            for candidate in buckets.get(key, ()):
+                if candidate not in candidates:
+                    candidates.append(candidate)
+
+        best, best_similarity = None, 0.0
+        for candidate in candidates:
+            similarity = estimate_similarity(signature, signatures[candidate])
+            if similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+
+        if best is not None and best_similarity >= threshold:
+            groups[best].append((position, best_similarity))
+            continue
+
+        # Only group representatives go into the buckets, so groups never chain away from their first member
+        groups[position] = [(position, 1.0)]
+        for key in band_keys:
+            buckets.setdefault(key, []).append(position)
+    return list(groups.values())
+
+
+def analysis_key(ingredient_quantities):
+    """Hashable form of extract_all_ingredients(..., with_quantities=True); equal keys analyze identically."""
+    return tuple((ingredient, tuple(sorted(quantity.items())) if quantity else None)
+                 for ingredient, quantity in ingredient_quantities)
+
+
+def analyze_batch(recipes, excel_path='Food_Map_Levels.xlsx', threshold=DEFAULT_THRESHOLD, score_mode='count',
+                  food_map=None):
+    """Analyze a batch of recipes, sharing work between near-duplicates.
+
+    recipes is a list of dicts with 'name' and 'text' (and optionally 'ingredients', as returned by
+    recipe_importer). Every recipe gets analyze_recipe's result for its own text: recipes that
+    extract to the same ingredients and quantities anywhere in the batch share one result, and
+    the rest share per-ingredient match results. Returns a report with per-recipe results (group
+    members carry 'duplicate_of' and 'similarity'), the near-duplicate groups, and how much work
+    was reused.
+    """
+    if food_map is None:
+        food_map = load_food_map(excel_path)
+    if not food_map:
+        return {'error': 'Could not load food map', 'results': [], 'groups': []}
+    index = build_match_index(food_map)
+
+    started = time.perf_counter()
+    signatures = [minhash_signature(ingredient_set(recipe['text'], recipe.get('ingredients') or None))
+                  for recipe in recipes]
+    groups = group_near_duplicates(signatures, threshold)
+    fingerprint_seconds = time.perf_counter() - started
+
+    stats = MatchStats()
+    matches = {}
+
+    def match_once(ingredient):
+        cached = matches.get(ingredient)
+        if cached is None:
+            cached = matches[ingredient] = match_ingredient(ingredient, food_map, stats, index)
+        return cached
+
+    def analyze(ingredient_quantities):
+        found_items, all_ingredients = collect_matches(
+            [ingredient for ingredient, _ in ingredient_quantities], match_once
+        )
+        return build_analysis_result(found_items, all_ingredients, ingredient_quantities, food_map, score_mode)
+
+    results = [None] * len(recipes)
+    analyses = {}
+    reused = 0
+    for group in groups:
+        representative = group[0][0]
+        for position, similarity in group:
+            ingredient_quantities = extract_all_ingredients(recipes[position]['text'], with_quantities=True)
+            # Similar is not identical: one added ingredient can change the levels found
+            key = analysis_key(ingredient_quantities)
+            analysis = analyses.get(key)
+            if analysis is None:
+                analysis = analyses[key] = analyze(ingredient_quantities)
+            else:
+                reused += 1
+            entry = {'name': recipes[position]['name'], 'results': analysis}
+            if position != representative:
+                entry['duplicate_of'] = recipes[representative]['name']
+                entry['similarity'] = round(similarity, 3)
+            results[position] = entry
+    CUMULATIVE_STATS.merge(stats)
+
+    return {
+        'results': results,
+        'groups': [
+            {'representative': recipes[group[0][0]]['name'],
+             'duplicates': [{'name': recipes[position]['name'], 'similarity': round(similarity, 3)}
+                            for position, similarity in group[1:]]}
+            for group in groups if len(group) > 1
+        ],
+        'recipes': len(recipes),
+        'analyzed': len(recipes) - reused,
+        'reused': reused,
+        'distinct_ingredients': len(matches),
+        'match_stats': stats.to_dict(),
+        'fingerprint_seconds': round(fingerprint_seconds, 4),
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+
+
+def load_recipes(paths):
+    """Load recipes from saved HTML pages, .txt files, or directories of them."""
+    recipes = []
+    for path in paths:
+        file_paths = [path]
+        if os.path.isdir(path):
+            file_paths = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        for file_path in file_paths:
+            lower = file_path.lower()
+            if lower.endswith(('.html', '.htm')):
+                parsed = import_recipe_file(file_path)
+                if parsed:
+                    recipes.append({'name': parsed['name'] or os.path.basename(file_path), 'text': parsed['text'],
+                                    'ingredients': parsed['ingredients'] if parsed['structured'] else None})
+            elif lower.endswith('.txt'):
+                with open(file_path, encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+                recipes.append({'name': os.path.basename(file_path),
+                                'text': recipe_text_from_html(text) if looks_like_html(text) else text})
+    return recipes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Screen a batch of recipes, analyzing near-duplicates only once.')
+    parser.add_argument('paths', nargs='+', help='saved recipe pages, .txt files or directories of them')
+    parser.add_argument('--excel', default='Food_Map_Levels.xlsx')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='estimated ingredient-set similarity needed to group recipes (0-1)')
+    parser.add_argument('--save', action='store_true', help='store every recipe in the recipe library')
+    parser.add_argument('--library', default=DEFAULT_LIBRARY_PATH)
+    args = parser.parse_args(argv)
+
+    recipes = load_recipes(args.paths)
+    report = analyze_batch(recipes, args.excel, args.threshold)
+    if 'error' in report:
+        print(f"Error: {report['error']}")
+        return 1
+
+    for group in report['groups']:
+        print(f"{group['representative']}")
+        for duplicate in group['duplicates']:
+            print(f"  ~ {duplicate['name']} ({duplicate['similarity']:.0%})")
+    print(f"Recipes: {report['recipes']}  Analyzed: {report['analyzed']}  Reused: {report['reused']}  "
+          f"Distinct ingredients: {report['distinct_ingredients']}  Time: {report['seconds']}s")
+
+    if args.save:
+        for recipe, entry in zip(recipes, report['results']):
+            save_recipe(recipe['text'], entry['results'], name=recipe['name'], db_path=args.library)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Recipe Importer - Structured HTML Import
+Pulls recipe ingredients out of saved recipe web pages using schema.org data.
+"""
+
+import html
+import json
+import os
+import re
+from html.parser import HTMLParser
+
+
+INGREDIENT_PROPS = {'recipeingredient', 'ingredients'}
+SKIPPED_TEXT_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head'}
+BLOCK_TAGS = {
+    'p', 'div', 'li', 'br', 'tr', 'ul', 'ol', 'table', 'section', 'article',
+    'header', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dt', 'dd', 'label'
+}
+VOID_TAGS = {'meta', 'link', 'br', 'img', 'input', 'hr', 'source', 'wbr'}
+LIST_TAGS = {'ul', 'ol'}
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class RecipePageParser(HTMLParser):
+    """Streaming parser collecting JSON-LD blocks, microdata ingredients and visible text."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.json_ld_blocks = []
+        self.microdata_ingredients = []
+        self.microdata_name = ''
+        self.text_parts = []
+        self._json_ld_buffer = None
+        self._capture_stack = []
+        self._scope_stack = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script' and (attrs.get('type') or '').strip().lower() == 'application/ld+json':
+            self._json_ld_buffer = []
+        if tag in SKIPPED_TEXT_TAGS:
+            self._skip_depth += 1
+        if tag in BLOCK_TAGS:
+            self.text_parts.append('\n')
+        if tag == 'li':
+            # </li> is optional: a sibling <li> ends any item still open in the same list
+            for capture in self._capture_stack:
+                if capture[0] == 'li' and not capture[4]:
+                    capture[2] = 0
+            self._pop_captures()
+
+        # An itemprop belongs to the innermost itemscope open around it, not to one it starts
+        in_recipe_scope = bool(self._scope_stack) and self._scope_stack[-1][2]
+        itemprop = (attrs.get('itemprop') or '').strip().lower()
+        if itemprop in INGREDIENT_PROPS or (itemprop == 'name' and in_recipe_scope and not self.microdata_name):
+            if attrs.get('content'):
+                self._store_microdata(itemprop, attrs['content'])
+            elif tag not in VOID_TAGS:
+                self._capture_stack.append([tag, itemprop, 0, [], 0])
+        if 'itemscope' in attrs and tag not in VOID_TAGS:
+            item_types = (attrs.get('itemtype') or '').lower().split()
+            self._scope_stack.append([tag, 0, any(t.rstrip('/').rsplit('/', 1)[-1] == 'recipe' for t in item_types)])
+        for scope in self._scope_stack:
+            if scope[0] == tag:
+                scope[1] += 1
+        for capture in self._capture_stack:
+            if capture[0] == 'li' and tag in LIST_TAGS:
+                capture[4] += 1
+            elif capture[0] == tag and not capture[4]:
+                capture[2] += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._json_ld_buffer is not None:
+            self.json_ld_blocks.append(''.join(self._json_ld_buffer))
+            self._json_ld_buffer = None
+        if tag in SKIPPED_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        if tag in BLOCK_TAGS:
+            self.text_parts.append('\n')
+
+        for scope in self._scope_stack:
+            if scope[0] == tag:
+                scope[1] -= 1
+        while self._scope_stack and self._scope_stack[-1][1] <= 0:
+            self._scope_stack.pop()
+
+        for capture in self._capture_stack:
+            if capture[0] == 'li' and tag in LIST_TAGS:
+                if capture[4]:
+                    capture[4] -= 1
+                else:
+                    # The parent list closed around an unclosed <li>
+                    capture[2] = 0
+            elif capture[0] == tag and not capture[4]:
+                capture[2] -= 1
+        self._pop_captures()
+
+    def handle_data(self, data):
+        if self._json_ld_buffer is not None:
+            self._json_ld_buffer.append(data)
+            return
+        for capture in self._capture_stack:
+            capture[3].append(data)
+        if not self._skip_depth:
+            self.text_parts.append(data)
+
+    def close(self):
+        super().close()
+        for capture in self._capture_stack:
+            capture[2] = 0
+        self._pop_captures()
+
+    def _pop_captures(self):
+        # Store every finished capture along with anything still open inside it
+        finished = [position for position, capture in enumerate(self._capture_stack) if capture[2] <= 0]
+        if not finished:
+            return
+        while len(self._capture_stack) > finished[0]:
+            _, itemprop, _, parts, _ = self._capture_stack.pop()
+            self._store_microdata(itemprop, ''.join(parts))
+
+    def _store_microdata(self, itemprop, value):
+        value = ' '.join(str(value).split())
+        if not value:
+            return
+        if itemprop == 'name':
+            self.microdata_name = value
+        else:
+            self.microdata_ingredients.append(value)
+
+    def visible_text(self):
+        """Return page text with one line per block element."""
+        text = ''.join(self.text_parts)
+        lines = (' '.join(line.split()) for line in text.split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+
+def _is_recipe_node(node):
+    node_type = node.get('@type')
+    if isinstance(node_type, list):
+        return any(str(t).lower() == 'recipe' for t in node_type)
+    return str(node_type).lower() == 'recipe'
+
+
+def find_json_ld_recipes(data):
+    """Yield every schema.org Recipe object nested anywhere in parsed JSON-LD."""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            if _is_recipe_node(node):
+                yield node
+            for key in ('@graph', 'mainEntity', 'mainEntityOfPage', 'itemListElement', 'item'):
+                if key in node:
+                    stack.append(node[key])
+
+
+def _ingredient_list(value):
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [str(v) for v in value if isinstance(v, (str, int, float))]
+    return []
+
+
+def _clean_ingredient_line(line):
+    line = html.unescape(re.sub(r'<[^>]+>', ' ', line))
+    return ' '.join(line.split()).strip()
+
+
+def parse_recipe_html(html_chunks):
+    """Parse recipe HTML (a string or an iterable of chunks) into name, ingredients and fallback text."""
+    parser = RecipePageParser()
+    if isinstance(html_chunks, str):
+        html_chunks = [html_chunks]
+    for chunk in html_chunks:
+        parser.feed(chunk)
+    parser.close()
+
+    name = ''
+    ingredients = []
+    for block in parser.json_ld_blocks:
+        try:
+            data = json.loads(block.strip())
+        except ValueError:
+            continue
+        for recipe in find_json_ld_recipes(data):
+            lines = _ingredient_list(recipe.get('recipeIngredient') or recipe.get('ingredients'))
+            if lines:
+                name = name or str(recipe.get('name') or '').strip()
+                ingredients.extend(lines)
+        if ingredients:
+            break
+
+    source = 'json-ld'
+    if not ingredients and parser.microdata_ingredients:
+        ingredients = parser.microdata_ingredients
+        name = parser.microdata_name
+        source = 'microdata'
+
+    ingredients = [line for line in (_clean_ingredient_line(i) for i in ingredients) if line]
+    if ingredients:
+        return {'name': name, 'ingredients': ingredients, 'structured': True,
+                'source': source, 'text': '\n'.join(ingredients)}
+
+    return {'name': name, 'ingredients': [], 'structured': False,
+            'source': 'text', 'text': parser.visible_text()}
+
+
+def looks_like_html(text):
+    """Return True when pasted text is an HTML page or fragment rather than plain recipe text."""
+    head = text.lstrip()[:2048].lower()
+    return head.startswith('<') and ('<html' in head or '<!doctype' in head or '<script' in head
+                                     or '<div' in head or '<body' in head or '<li' in head)
+
+
+def recipe_text_from_html(html_text):
+    """Convert pasted HTML into recipe text ready for analyze_recipe."""
+    return parse_recipe_html(html_text)['text']
+
+
+def _read_chunks(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def import_recipe_file(path):
+    """Import a single saved recipe page. Returns None if the file cannot be read."""
+    try:
+        parsed = parse_recipe_html(_read_chunks(path))
+    except OSError as e:
+        print(f"Error reading recipe file {path}: {e}")
+        return None
+
+    if not parsed['name']:
+        parsed['name'] = os.path.splitext(os.path.basename(path))[0]
+    parsed['path'] = path
+    return parsed
+
+
+def import_recipe_folder(folder, extensions=('.html', '.htm')):
+    """Import every saved recipe page in a folder, sorted by file name."""
+    imported = []
+    try:
+        names = sorted(os.listdir(folder))
+    except OSError as e:
+        print(f"Error reading recipe folder {folder}: {e}")
+        return imported
+
+    for file_name in names:
+        if not file_name.lower().endswith(tuple(extensions)):
+            continue
+        parsed = import_recipe_file(os.path.join(folder, file_name))
+        if parsed is not None:
+            imported.append(parsed)
+    return imported
@@ -0,0 +1,358 @@
+"""
+Recipe Library - Persisted Scan Results
+Stores analyzed recipes with their match results and a reverse index from
+food-map entries to the recipes that matched them, so map edits only
+re-score the recipes they affect.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from recipe_checker_simple import (
+    build_match_index,
+    calculate_total_risk_score,
+    clean_food_item_name,
+    load_food_map,
+    match_ingredient,
+    parse_recipe,
+)
+
+
+DEFAULT_LIBRARY_PATH = 'recipe_library.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    text_hash TEXT NOT NULL UNIQUE,
+    recipe_text TEXT NOT NULL,
+    total_score INTEGER NOT NULL,
+    max_level INTEGER NOT NULL DEFAULT 0,
+    level_0_count INTEGER NOT NULL DEFAULT 0,
+    level_1_count INTEGER NOT NULL DEFAULT 0,
+    level_2_count INTEGER NOT NULL DEFAULT 0,
+    level_3_count INTEGER NOT NULL DEFAULT 0,
+    found_items TEXT NOT NULL,
+    all_ingredients TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipe_items (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    food_item TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    PRIMARY KEY (recipe_id, food_item)
+);
+CREATE INDEX IF NOT EXISTS idx_recipe_items_item_level ON recipe_items(food_item, level);
+CREATE TABLE IF NOT EXISTS recipe_ingredients (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    ingredient TEXT NOT NULL,
+    matched INTEGER NOT NULL,
+    level INTEGER,
+    PRIMARY KEY (recipe_id, ingredient)
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_recipes_total_score ON recipes(total_score);
+CREATE INDEX IF NOT EXISTS idx_recipes_safest ON recipes(max_level, total_score);
+CREATE INDEX IF NOT EXISTS idx_recipes_never ON recipes(level_3_count, total_score);
+"""
+
+LEVELS = (0, 1, 2, 3)
+
+_write_lock = threading.Lock()
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+
+
+def connect_library(db_path=DEFAULT_LIBRARY_PATH):
+    """Open the library database, creating and migrating the schema the first time a path is opened."""
+    # In-memory databases start empty on every connect; a deleted file needs its schema again
+    key = None if db_path == ':memory:' else os.path.abspath(db_path)
+    initialized = key in _initialized_paths and os.path.exists(key)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    if initialized:
+        return conn
+    with _schema_lock:
+        conn.executescript(SCHEMA)
+        _add_missing_columns(conn)
+        conn.executescript(INDEXES)
+        if key is not None:
+            _initialized_paths.add(key)
+    return conn
+
+
+def _add_missing_columns(conn):
+    """Bring libraries created before the level-count columns existed up to date."""
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(recipes)')}
+    missing = [f'level_{level}_count' for level in LEVELS if f'level_{level}_count' not in columns]
+    if not missing:
+        return
+
+    for column in missing:
+        conn.execute(f'ALTER TABLE recipes ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+    conn.execute('UPDATE recipes SET max_level = 0 WHERE max_level IS NULL')
+    for level in LEVELS:
+        conn.execute(
+            f'UPDATE recipes SET level_{level}_count = '
+            '(SELECT COUNT(*) FROM recipe_items WHERE recipe_items.recipe_id = recipes.id AND recipe_items.level = ?)',
+            (level,)
+        )
+    conn.commit()
+
+
+def recipe_text_hash(recipe_text):
+    """Stable identity for a recipe text, ignoring surrounding whitespace on each line."""
+    normalized = '\n'.join(line.strip() for line in recipe_text.strip().splitlines())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def default_recipe_name(recipe_text):
+    """Use the first non-empty line of a recipe as its name."""
+    for line in recipe_text.splitlines():
+        line = line.strip()
+        if line:
+            return line[:60]
+    return 'Untitled recipe'
+
+
+def _write_results(conn, recipe_id, found_items, all_ingredients):
+    """Replace the stored match results and index rows for one recipe."""
+    total_score = calculate_total_risk_score(found_items)
+    level_counts = {level: 0 for level in LEVELS}
+    for info in found_items.values():
+        level_counts[info['level']] = level_counts.get(info['level'], 0) + 1
+    max_level = max((info['level'] for info in found_items.values()), default=0)
+
+    conn.execute(
+        'UPDATE recipes SET total_score = ?, max_level = ?, level_0_count = ?, level_1_count = ?, '
+        'level_2_count = ?, level_3_count = ?, found_items = ?, all_ingredients = ?, updated_at = ? WHERE id = ?',
+        (total_score, max_level, level_counts[0], level_counts[1], level_counts[2], level_counts[3],
+         json.dumps(found_items), json.dumps(all_ingredients), time.time(), recipe_id)
+    )
+    conn.execute('DELETE FROM recipe_items WHERE recipe_id = ?', (recipe_id,))
+    conn.execute('DELETE FROM recipe_ingredients WHERE recipe_id = ?', (recipe_id,))
+    conn.executemany(
+        'INSERT INTO recipe_items (recipe_id, food_item, level) VALUES (?, ?, ?)',
+        [(recipe_id, food_item, info['level']) for food_item, info in found_items.items()]
+    )
+    conn.executemany(
+        'INSERT INTO recipe_ingredients (recipe_id, ingredient, matched, level) VALUES (?, ?, ?, ?)',
+        [(recipe_id, ingredient, int(info['matched']), info['level']) for ingredient, info in all_ingredients.items()]
+    )
+
+
+def save_recipe(recipe_text, results, name=None, db_path=DEFAULT_LIBRARY_PATH):
+    """Store a recipe with its analyze_recipe results. Returns the recipe id, or None on error."""
+    if 'error' in results:
+        return None
+
+    text_hash = recipe_text_hash(recipe_text)
+    try:
+        with _write_lock, closing(connect_library(db_path)) as conn, conn:
+            row = conn.execute('SELECT id FROM recipes WHERE text_hash = ?', (text_hash,)).fetchone()
+            if row:
+                recipe_id = row['id']
+                if name:
+                    conn.execute('UPDATE recipes SET name = ? WHERE id = ?', (name, recipe_id))
+            else:
+                cursor = conn.execute(
+                    "INSERT INTO recipes (name, text_hash, recipe_text, total_score, found_items, all_ingredients, updated_at) "
+                    "VALUES (?, ?, ?, 0, '{}', '{}', ?)",
+                    (name or default_recipe_name(recipe_text), text_hash, recipe_text, time.time())
+                )
+                recipe_id = cursor.lastrowid
+            _write_results(conn, recipe_id, results['found_items'], results['all_ingredients'])
+            return recipe_id
+    except sqlite3.Error as e:
+        print(f"Error saving recipe to library: {e}")
+        return None
+
+
+def find_affected_recipes(food_items, db_path=DEFAULT_LIBRARY_PATH):
+    """Return ids of stored recipes whose score may change when these food-map entries change.
+
+    That is every recipe that matched one of the entries, every recipe with an ingredient
+    containing the entry's name, and every recipe with an unmatched ingredient the entry
+    would match on its own (e.g. "1 tsp paprika" once "smoked paprika" is added).
+    """
+    names = {clean_food_item_name(item).lower() for item in food_items}
+    names.discard('')
+    if not names:
+        return set()
+
+    affected = set()
+    try:
+        with closing(connect_library(db_path)) as conn:
+            for name in names:
+                rows = conn.execute('SELECT recipe_id FROM recipe_items WHERE food_item = ?', (name,))
+                affected.update(row['recipe_id'] for row in rows)
+
+                pattern = re.compile(r'\b' + re.escape(name) + r'\b')
+                rows = conn.execute(
+                    "SELECT recipe_id, ingredient FROM recipe_ingredients WHERE ingredient LIKE ? ESCAPE '\\'",
+                    ('%' + name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%',)
+                )
+                affected.update(row['recipe_id'] for row in rows if pattern.search(row['ingredient']))
+
+            # Core matching also works the other way round (the entry contains the ingredient),
+            # so re-match unmatched ingredients against each entry alone
+            entry_maps = []
+            for name in names:
+                entry_map = {name: {'level': 0, 'notes': ''}}
+                entry_maps.append((entry_map, build_match_index(entry_map)))
+            unmatched = conn.execute('SELECT recipe_id, ingredient FROM recipe_ingredients WHERE matched = 0').fetchall()
+            newly_matched = {
+                ingredient for ingredient in {row['ingredient'] for row in unmatched}
+                if any(match_ingredient(ingredient, entry_map, index=index)[0] is not None
+                       for entry_map, index in entry_maps)
+            }
+            affected.update(row['recipe_id'] for row in unmatched if row['ingredient'] in newly_matched)
+    except sqlite3.Error as e:
+        print(f"Error reading recipe library: {e}")
+    return affected
+
+
+def rescore_recipes(recipe_ids, excel_path='Food_Map_Levels.xlsx', db_path=DEFAULT_LIBRARY_PATH, food_map=None):
+    """Re-run matching for the given stored recipes against the current food map. Returns the number updated."""
+    if not recipe_ids:
+        return 0
+    if food_map is None:
+        food_map = load_food_map(excel_path)
+    if not food_map:
+        return 0
+
+    index = build_match_index(food_map)
+    updated = 0
+    try:
+        with closing(connect_library(db_path)) as conn:
+            for recipe_id in sorted(recipe_ids):
+                row = conn.execute('SELECT recipe_text FROM recipes WHERE id = ?', (recipe_id,)).fetchone()
+                if row is None:
+                    continue
+                found_items, all_ingredients = parse_recipe(row['recipe_text'], food_map, index=index)
+                with _write_lock, conn:
+                    _write_results(conn, recipe_id, found_items, all_ingredients)
+                updated += 1
+    except sqlite3.Error as e:
+        print(f"Error re-scoring recipe library: {e}")
+    return updated
+
+
+def rescore_affected(food_items, excel_path='Food_Map_Levels.xlsx', db_path=DEFAULT_LIBRARY_PATH):
+    """Re-score only the stored recipes affected by edits to these food-map entries."""
+    return rescore_recipes(find_affected_recipes(food_items, db_path), excel_path, db_path)
+
+
+def rescore_in_background(food_items, excel_path='Food_Map_Levels.xlsx', db_path=DEFAULT_LIBRARY_PATH):
+    """Start a daemon thread that re-scores the recipes affected by a map edit."""
+    thread = threading.Thread(
+        target=rescore_affected,
+        args=(list(food_items), excel_path, db_path),
+        name='recipe-library-rescore',
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def _summary_row(row):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'total_score': row['total_score'],
+        'max_level': row['max_level'],
+        'level_counts': {level: row[f'level_{level}_count'] for level in LEVELS},
+        'updated_at': row['updated_at'],
+    }
+
+
+SUMMARY_COLUMNS = 'id, name, total_score, max_level, level_0_count, level_1_count, level_2_count, level_3_count, updated_at'
+
+
+def query_recipes(max_score=None, max_level=None, exclude_levels=(), contains_item=None, item_level=None,
+                  limit=50, db_path=DEFAULT_LIBRARY_PATH):
+    """Find stored recipes by score, worst level, excluded levels and contained food items.
+
+    Results are ordered safest first (lowest worst level, then lowest score).
+    For example, exclude_levels=(3,) with max_score=3 gives "score <= 3 and no Never items",
+    and contains_item='garlic', item_level=1 gives "recipes containing garlic at Moderation".
+    """
+    conditions = []
+    params = []
+    if max_score is not None:
+        conditions.append('total_score <= ?')
+        params.append(max_score)
+    if max_level is not None:
+        conditions.append('max_level <= ?')
+        params.append(max_level)
+    for level in exclude_levels:
+        if level in LEVELS:
+            conditions.append(f'level_{level}_count = 0')
+    if contains_item:
+        item_name = clean_food_item_name(contains_item).lower()
+        if item_level is None:
+            conditions.append('id IN (SELECT recipe_id FROM recipe_items WHERE food_item = ?)')
+            params.append(item_name)
+        else:
+            conditions.append('id IN (SELECT recipe_id FROM recipe_items WHERE food_item = ? AND level = ?)')
+            params.extend([item_name, item_level])
+
+    sql = f'SELECT {SUMMARY_COLUMNS} FROM recipes'
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY max_level, total_score, id'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    try:
+        with closing(connect_library(db_path)) as conn:
+            return [_summary_row(row) for row in conn.execute(sql, params)]
+    except sqlite3.Error as e:
+        print(f"Error querying recipe library: {e}")
+        return []
+
+
+def safest_recipes(k=10, db_path=DEFAULT_LIBRARY_PATH):
+    """Return the top-k safest stored recipes."""
+    return query_recipes(limit=k, db_path=db_path)
+
+
+def get_recipe(recipe_id, db_path=DEFAULT_LIBRARY_PATH):
+    """Return a stored recipe with its text and match results, or None if it does not exist."""
+    try:
+        with closing(connect_library(db_path)) as conn:
+            row = conn.execute(
+                f'SELECT {SUMMARY_COLUMNS}, recipe_text, found_items, all_ingredients FROM recipes WHERE id = ?',
+                (recipe_id,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Error reading recipe library: {e}")
+        return None
+    if row is None:
+        return None
+
+    recipe = _summary_row(row)
+    recipe['recipe_text'] = row['recipe_text']
+    recipe['found_items'] = json.loads(row['found_items'])
+    recipe['all_ingredients'] = json.loads(row['all_ingredients'])
+    return recipe
+
+
+def list_library_items(db_path=DEFAULT_LIBRARY_PATH):
+    """Return every food-map entry matched by at least one stored recipe, alphabetically."""
+    try:
+        with closing(connect_library(db_path)) as conn:
+            return [row['food_item'] for row in conn.execute('SELECT DISTINCT food_item FROM recipe_items ORDER BY food_item')]
+    except sqlite3.Error as e:
+        print(f"Error reading recipe library: {e}")
+        return []
@@ -0,0 +1,210 @@
+"""
+Replay Requests - Benchmark Against Captured Traffic
+Feeds requests recorded by request_capture.py back through analyze_recipe,
+either at the original pace (scaled by --speed) or as fast as possible, and
+compares the replayed latencies with the recorded ones. Records that only hold
+a text hash are resolved through the recipe library; live-typing records
+captured without text never reach the library, so they are skipped and counted.
+
+Usage:
+    python replay_requests.py captured_requests.jsonl --speed 0
+    python replay_requests.py captured_requests.jsonl --speed 2 --workers 4 --categorize
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+
+from load_test import percentile
+from recipe_checker_simple import add_food_item, analyze_recipe
+from recipe_library import DEFAULT_LIBRARY_PATH
+from request_capture import DEFAULT_CAPTURE_PATH, rotated_path
+
+
+def read_captured(path, max_backups=100):
+    """Read captured records oldest first, including rotated backups. Lines that aren't capture records are skipped."""
+    paths = [rotated_path(path, number) for number in range(max_backups, 0, -1)
+             if os.path.exists(rotated_path(path, number))]
+    paths.append(path)
+
+    records = []
+    for file_path in paths:
+        try:
+            with open(file_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and record.get('type') in ('analyze', 'categorize'):
+                        records.append(record)
+        except OSError as e:
+            print(f"Error reading capture file {file_path}: {e}")
+    return records
+
+
+def load_library_texts(db_path):
+    """Map text hash → recipe text for every recipe in a library database."""
+    if not os.path.exists(db_path):
+        return {}
+    try:
+        with closing(sqlite3.connect(db_path)) as conn:
+            return dict(conn.execute('SELECT text_hash, recipe_text FROM recipes'))
+    except sqlite3.Error as e:
+        print(f"Error reading recipe library {db_path}: {e}")
+        return {}
+
+
+def _offsets(records):
+    start = None
+    offsets = []
+    for record in records:
+        try:
+            moment = datetime.fromisoformat(record['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            moment = start or 0.0
+        if start is None:
+            start = moment
+        offsets.append(max(0.0, moment - start))
+    return offsets
+
+
+def replay(records, excel_path='Food_Map_Levels.xlsx', speed=1.0, workers=1, texts=None, categorize=False):
+    """Replay captured records and return a report dict.
+
+    speed scales the recorded inter-arrival times (2 = twice as fast, 0 = no waiting). Categorize
+    records are replayed only with categorize=True, so point excel_path at a copy of the map.
+    """
+    texts = texts or {}
+    samples = []
+    skipped = defaultdict(int)
+    samples_lock = threading.Lock()
+
+    def run(record):
+        kind = record['type']
+        started = time.perf_counter()
+        if kind == 'analyze':
+            results = analyze_recipe(record['_text'], excel_path=excel_path, score_mode=record.get('score_mode', 'count'))
+            ok = 'error' not in results
+        else:
+            ok = all([add_food_item(excel_path, item, record['level']) for item in record.get('items', [])])
+        with samples_lock:
+            samples.append((kind, time.perf_counter() - started, record.get('seconds'), ok))
+
+    runnable = []
+    for record in records:
+        if record['type'] == 'analyze':
+            text = record.get('text') or texts.get(record.get('text_hash'))
+            if not text:
+                # Live results are never saved to the library, so only captured text can rebuild them
+                skipped['live_without_text' if record.get('source') == 'live' else 'unresolved_text'] += 1
+                continue
+            runnable.append(dict(record, _text=text))
+        elif categorize:
+            runnable.append(record)
+        else:
+            skipped['categorize'] += 1
+
+    offsets = _offsets(runnable)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = []
+        for offset, record in zip(offsets, runnable):
+            if speed > 0:
+                delay = offset / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(pool.submit(run, record))
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    def summarize(rows):
+        replayed = sorted(latency for _, latency, _, _ in rows)
+        recorded = sorted(seconds for _, _, seconds, _ in rows if seconds is not None)
+        return {
+            'count': len(rows),
+            'errors': sum(1 for _, _, _, ok in rows if not ok),
+            'throughput_per_s': round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(replayed, 50) * 1000, 2),
+            'p95_ms': round(percentile(replayed, 95) * 1000, 2),
+            'p99_ms': round(percentile(replayed, 99) * 1000, 2),
+            'recorded_p50_ms': round(percentile(recorded, 50) * 1000, 2),
+            'recorded_p95_ms': round(percentile(recorded, 95) * 1000, 2),
+        }
+
+    by_type = defaultdict(list)
+    for sample in samples:
+        by_type[sample[0]].append(sample)
+    return {
+        'records': len(records),
+        'replayed': len(samples),
+        'skipped': dict(skipped),
+        'speed': speed,
+        'workers': workers,
+        'elapsed_s': round(elapsed, 3),
+        'types': {kind: summarize(rows) for kind, rows in sorted(by_type.items())},
+    }
+
+
+def print_report(report):
+    """Print a human-readable summary table."""
+    print(f"Records: {report['records']}  Replayed: {report['replayed']}  Speed: {report['speed'] or 'max'}  "
+          f"Workers: {report['workers']}  Elapsed: {report['elapsed_s']}s")
+    for reason, count in report['skipped'].items():
+        print(f"  skipped {count} ({reason})")
+    header = (f"{'type':<12}{'count':>8}{'errors':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"{'rec p50':>10}{'rec p95':>10}")
+    print(header)
+    print('-' * len(header))
+    for kind, stats in report['types'].items():
+        print(f"{kind:<12}{stats['count']:>8}{stats['errors']:>8}{stats['throughput_per_s']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+              f"{stats['recorded_p50_ms']:>10}{stats['recorded_p95_ms']:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay captured requests through analyze_recipe.')
+    parser.add_argument('capture', nargs='?', default=DEFAULT_CAPTURE_PATH, help='capture file (rotated backups included)')
+    parser.add_argument('--speed', type=float, default=1.0, help='pace multiplier; 0 replays as fast as possible')
+    parser.add_argument('--workers', type=int, default=1, help='concurrent replay threads')
+    parser.add_argument('--excel', default='Food_Map_Levels.xlsx', help='food map to copy into the sandbox')
+    parser.add_argument('--library', default=DEFAULT_LIBRARY_PATH, help='resolves records captured without text')
+    parser.add_argument('--categorize', action='store_true', help='also replay categorize actions on the sandbox map')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    records = read_captured(args.capture)
+    if not records:
+        print(f"No captured requests in {args.capture}")
+        return 1
+
+    # Work on a copy so replayed categorize actions never touch the real food map
+    workdir = tempfile.mkdtemp(prefix='recipe-replay-')
+    try:
+        excel_path = os.path.join(workdir, os.path.basename(args.excel))
+        shutil.copy(args.excel, excel_path)
+        report = replay(records, excel_path, args.speed, args.workers, load_library_texts(args.library),
+                        args.categorize)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
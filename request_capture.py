@@ -0,0 +1,151 @@
+"""
+Request Capture - Opt-In Traffic Recording
+Records every analysis request and categorize action to a JSONL file through a
+buffered background writer with size-based rotation, so capturing never adds
+file I/O to the request thread. Replay the file with replay_requests.py.
+
+Enable it with environment variables before starting the app:
+    RECIPE_CAPTURE=1            turn capture on
+    RECIPE_CAPTURE_PATH=...     output file (default captured_requests.jsonl)
+    RECIPE_CAPTURE_TEXT=1       store full recipe texts, not just their hashes
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from recipe_checker_simple import journal_timestamp
+from recipe_library import recipe_text_hash
+
+
+DEFAULT_CAPTURE_PATH = 'captured_requests.jsonl'
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+WRITE_BATCH_SIZE = 500
+_STOP = object()
+
+
+def rotated_path(path, number):
+    """Name of the number-th rotated backup of a capture file (1 is the newest)."""
+    return f"{path}.{number}"
+
+
+class RequestCapture:
+    """Queue-backed JSONL recorder. record() only enqueues; a daemon thread batches the writes."""
+
+    def __init__(self, path=DEFAULT_CAPTURE_PATH, include_text=False, max_bytes=DEFAULT_MAX_BYTES,
+                 backups=DEFAULT_BACKUPS, flush_interval=1.0, max_pending=10000):
+        self.path = path
+        self.include_text = include_text
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name='request-capture', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, kind, **fields):
+        """Queue one record without blocking; records are dropped (and counted) if the writer falls behind."""
+        fields['type'] = kind
+        fields['timestamp'] = journal_timestamp()
+        try:
+            self._queue.put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+
+    def capture_analysis(self, source, recipe_text, results, seconds, map_version=None):
+        """Record one analysis request from its analyze_recipe-style results."""
+        record = {
+            'source': source,
+            'text_hash': recipe_text_hash(recipe_text),
+            'chars': len(recipe_text),
+            'ingredients': len(results.get('all_ingredients') or {}),
+            'score_mode': results.get('score_mode', 'count'),
+            'total_score': results.get('total_score'),
+            'error': results.get('error'),
+            'seconds': round(seconds, 6),
+            'map_version': map_version,
+        }
+        if self.include_text:
+            record['text'] = recipe_text
+        self.record('analyze', **record)
+
+    def capture_categorize(self, items, level, added, seconds):
+        """Record one categorize action."""
+        self.record('categorize', items=list(items), level=level, added=added, seconds=round(seconds, 6))
+
+    def _run(self):
+        buffer = []
+        last_write = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            stop = item is _STOP
+            if item is not None and not stop:
+                buffer.append(item)
+            if buffer and (stop or len(buffer) >= WRITE_BATCH_SIZE
+                           or time.monotonic() - last_write >= self.flush_interval):
+                self._write(buffer)
+                buffer = []
+                last_write = time.monotonic()
+            if stop:
+                return
+
+    def _write(self, records):
+        lines = [(json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8') for record in records]
+        try:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            while lines:
+                # Fill the current file up to max_bytes, then rotate; a file always takes at least one line
+                batch = []
+                while lines and (not size or size + len(lines[0]) <= self.max_bytes):
+                    size += len(lines[0])
+                    batch.append(lines.pop(0))
+                if batch:
+                    with open(self.path, 'ab') as f:
+                        f.write(b''.join(batch))
+                    self.written += len(batch)
+                if lines:
+                    self._rotate()
+                    size = 0
+        except OSError as e:
+            self.dropped += len(lines)
+            print(f"Error writing request capture {self.path}: {e}")
+
+    def _rotate(self):
+        if self.backups < 1:
+            os.remove(self.path)
+            return
+        for number in range(self.backups - 1, 0, -1):
+            if os.path.exists(rotated_path(self.path, number)):
+                os.replace(rotated_path(self.path, number), rotated_path(self.path, number + 1))
+        os.replace(self.path, rotated_path(self.path, 1))
+        self.rotations += 1
+
+    def close(self):
+        """Write everything still queued and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+
+def capture_from_env():
+    """Build a RequestCapture from the RECIPE_CAPTURE* environment variables, or None when capture is off."""
+    if os.environ.get('RECIPE_CAPTURE', '').lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    return RequestCapture(
+        path=os.environ.get('RECIPE_CAPTURE_PATH') or DEFAULT_CAPTURE_PATH,
+        include_text=os.environ.get('RECIPE_CAPTURE_TEXT', '').lower() in ('1', 'true', 'yes', 'on'),
+    )
@@ -0,0 +1,42 @@
+from compatibility import CompatibilityMatrix
+from recipe_checker_simple import analyze_recipe
+from recipe_library import save_recipe
+
+
+FOOD_MAP = {
+    'rice': {'level': 0, 'notes': ''},
+    'chicken': {'level': 1, 'notes': ''},
+}
+RECIPE = '2 cups rice\n1 tsp smoked paprika\n1 lb chicken'
+PROFILE = {'paprika': 3, 'smoked paprika': 3}
+
+
+def build_matrix(tmp_path, profiles, inherit=True):
+    db_path = str(tmp_path / 'library.db')
+    save_recipe(RECIPE, analyze_recipe(RECIPE, food_map=FOOD_MAP), name='Paprika chicken', db_path=db_path)
+    return CompatibilityMatrix.from_library(db_path, food_map=FOOD_MAP).compute(profiles, inherit)
+
+
+def test_profile_item_missing_from_shared_map_is_scored(tmp_path):
+    matrix = build_matrix(tmp_path, {'alice': PROFILE})
+
+    profile_map = dict(FOOD_MAP, **{item: {'level': level, 'notes': ''} for item, level in PROFILE.items()})
+    direct = analyze_recipe(RECIPE, food_map=profile_map)
+    assert max(info['level'] for info in direct['found_items'].values()) == 3
+    assert matrix.worst[0, 0] == 3
+    assert matrix.scores[0, 0] == direct['count_score']
+    assert matrix.safe_recipes('alice', max_level=1) == []
+
+
+def test_unmatched_profile_items_are_reported(tmp_path):
+    matrix = build_matrix(tmp_path, {'bob': {'peanuts': 3}})
+
+    assert matrix.unmatched_items == {'bob': ['peanuts']}
+    assert matrix.worst[0, 0] == 1
+
+
+def test_without_inherit_only_profile_items_count(tmp_path):
+    matrix = build_matrix(tmp_path, {'alice': PROFILE}, inherit=False)
+
+    assert matrix.worst[0, 0] == 3
+    assert matrix.scores[0, 0] == 3